@@ -1,26 +1,36 @@
+import os
+from pathlib import Path
+
 import streamlit as st
 import joblib
 import pandas as pd
 import numpy as np
 
-bundle = joblib.load("svm_with_scaler.pkl")
-model = bundle["model"]
-scaler = bundle["scaler"]
+from features import WINDOW_SEC, feature_order, emotion_codes, head_pose_codes, model_matrix, capture_matrix
+from sessions import tail_csv  # importable once features has put the capture directory on sys.path
 
-emotion_map = {
-    "happy": 0,
-    "neutral": 1,
-    "sad": 2,
-    "tired": 3
+MODEL_BUNDLES = {
+    "svm": "svm_with_scaler.pkl",
+    "nystroem": "nystroem_with_scaler.pkl"
 }
 
-pose_cols = ["pose_center", "pose_down", "pose_left", "pose_right", "pose_up"]
+# select the model variant with BOREDOM_MODEL=svm|nystroem; model_report.json records which one
+# train.py recommends for single-row scoring (this app) and for batches
+MODEL_VARIANT = os.environ.get("BOREDOM_MODEL", "svm")
+
+
+# live mode follows the CSV written by capture.py (override with BOREDOM_LIVE_CSV)
+LIVE_CSV = Path(os.environ.get("BOREDOM_LIVE_CSV", Path(__file__).resolve().parent.parent / "output" / "data.csv"))
+LIVE_REFRESH_SEC = 5
+LIVE_HISTORY = 360  # windows kept for the charts (one hour of 10 s windows)
+LIVE_BACKLOG_BYTES = 64 * 1024  # how much of an existing CSV is shown when live mode starts
+
+
+@st.cache_resource
+def load_bundle(variant):
+    bundle = joblib.load(MODEL_BUNDLES[variant])
+    return bundle["model"], bundle["scaler"]
 
-feature_order = [
-    "blink_rate", "yawn_count", "gaze_on_screen", "head_movement",
-    "emotion_encoded", "pose_center", "pose_down", "pose_left",
-    "pose_right", "pose_up"
-]
 
 # Quiz questions
 quiz_questions = [
@@ -43,26 +53,12 @@ quiz_questions = [
 
 
 def predict_attention(blink_count, yawn_count, gaze_on_screen, head_movement_count,
-                      emotion, head_pose):
-    blink_rate = blink_count / 10
-    yawn_rate = yawn_count / 10
-    head_movement_rate = head_movement_count / 10
-
-    emotion_encoded = emotion_map.get(emotion.lower(), 1)
-
-    pose_vector = {col: 0 for col in pose_cols}
-    pose_key = f"pose_{head_pose.lower()}"
-    if pose_key in pose_vector:
-        pose_vector[pose_key] = 1
-
-    input_data = pd.DataFrame([{
-        "blink_rate": blink_rate,
-        "yawn_count": yawn_rate,
-        "gaze_on_screen": gaze_on_screen,
-        "head_movement": head_movement_rate,
-        "emotion_encoded": emotion_encoded,
-        **pose_vector
-    }])[feature_order]
+                      emotion, head_pose, variant=MODEL_VARIANT):
+    model, scaler = load_bundle(variant)
+    # counts are over one capture window; the model takes per-second rates
+    input_data = pd.DataFrame(model_matrix(
+        blink_count / WINDOW_SEC, yawn_count / WINDOW_SEC, gaze_on_screen, head_movement_count / WINDOW_SEC,
+        emotion_codes([emotion]), head_pose_codes([head_pose])), columns=feature_order)
 
     scaled_input = scaler.transform(input_data)
     pred = model.predict(scaled_input)[0]
@@ -72,6 +68,81 @@ def predict_attention(blink_count, yawn_count, gaze_on_screen, head_movement_cou
     return label
 
 
+def initial_offset(path, backlog_bytes=LIVE_BACKLOG_BYTES):
+    """Offset of the first complete row in the last `backlog_bytes` of the CSV, so a long session isn't replayed."""
+    size = path.stat().st_size
+    if size <= backlog_bytes:
+        return 0
+    with open(path, "rb") as f:
+        f.seek(size - backlog_bytes)
+        f.readline()
+        return f.tell()
+
+
+def read_live_windows(path, offset, variant=MODEL_VARIANT):
+    """Capture windows appended since `offset`, scored in one batch. Returns (DataFrame or None, new offset)."""
+    rows, offset = tail_csv(path, offset)
+    if not rows:
+        return None, offset
+    raw = pd.DataFrame(rows)
+    model, scaler = load_bundle(variant)
+    pred = model.predict(scaler.transform(pd.DataFrame(capture_matrix(raw), columns=feature_order)))
+    windows = pd.DataFrame({
+        "time": pd.to_datetime(raw["timestamp"].astype(float), unit="s"),
+        "blink_rate": raw["blink_rate"].astype(float),
+        "yawn_rate": raw["yawn_rate"].astype(float),
+        "gaze_on_screen": raw["gaze_ratio"].astype(float) * 100,
+        "head_movement": raw["head_movement_rate"].astype(float),
+        "emotion": raw["emotion"],
+        "status": np.where(pred == 0, "bore", "engaged"),
+    })
+    return windows, offset
+
+
+@st.fragment(run_every=LIVE_REFRESH_SEC)
+def live_dashboard():
+    """Reads only the rows capture appended since the last refresh, so each refresh costs the same."""
+    if not LIVE_CSV.exists():
+        st.info(f"📡 Waiting for capture output at {LIVE_CSV}")
+        return
+    if st.session_state.live_offset is None:
+        st.session_state.live_offset = initial_offset(LIVE_CSV)
+
+    new, st.session_state.live_offset = read_live_windows(LIVE_CSV, st.session_state.live_offset)
+    if new is not None:
+        st.session_state.live_windows = pd.concat([st.session_state.live_windows, new]).tail(LIVE_HISTORY)
+    history = st.session_state.live_windows
+    if history.empty:
+        st.info("📡 Waiting for the first capture window...")
+        return
+
+    latest = history.iloc[-1]
+    bored = latest["status"] == "bore"
+    if bored:
+        st.error("⚠️ BOREDOM DETECTED - User is feeling bored")
+    else:
+        st.success("✅ ENGAGED - User is actively focused and attentive")
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Bored windows", f"{(history['status'] == 'bore').mean():.0%}")
+    m2.metric("Gaze on Screen", f"{latest['gaze_on_screen']:.0f}%")
+    m3.metric("Blinks / s", f"{latest['blink_rate']:.2f}")
+    m4.metric("Emotion", latest["emotion"])
+
+    charts = history.set_index("time")
+    st.line_chart(charts[["blink_rate", "yawn_rate", "head_movement"]])
+    st.line_chart(charts[["gaze_on_screen"]])
+
+    # open the quiz when the user becomes bored; a full rerun is needed to draw it outside this fragment
+    was_bored = st.session_state.live_bored
+    st.session_state.live_bored = bored
+    if new is not None and bored and not was_bored and not st.session_state.show_quiz:
+        st.session_state.show_quiz = True
+        st.session_state.quiz_answers = [None, None, None]
+        st.session_state.quiz_submitted = False
+        st.rerun()
+
+
 st.set_page_config(page_title="Boredom Detection System", page_icon="🧠", layout="wide")
 
 st.markdown("""
@@ -479,26 +550,36 @@ if 'quiz_answers' not in st.session_state:
     st.session_state.quiz_answers = [None, None, None]
 if 'quiz_submitted' not in st.session_state:
     st.session_state.quiz_submitted = False
-
-col1, col2 = st.columns([1, 1], gap="large")
-
-with col1:
-    st.markdown('<div class="neuro-card">', unsafe_allow_html=True)
-    blink_count = st.number_input("Blink Count", min_value=0, max_value=100, value=10, key="blink")
-    yawn_count = st.number_input("Yawn Count", min_value=0, max_value=50, value=2, key="yawn")
-    gaze_on_screen = st.slider("Gaze on Screen (%)", min_value=0, max_value=100, value=75, key="gaze")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col2:
-    st.markdown('<div class="neuro-card">', unsafe_allow_html=True)
-    head_movement = st.number_input("Head Movements", min_value=0, max_value=100, value=5, key="head")
-    emotion = st.selectbox("Emotional State", ["happy", "neutral", "sad", "tired"], key="emotion")
-    head_pose = st.selectbox("Head Position", ["center", "down", "left", "right", "up"], key="pose")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-col_a, col_b, col_c = st.columns([1, 2, 1])
-with col_b:
-    predict_btn = st.button("🔍 Detect Boredom Level")
+if 'live_offset' not in st.session_state:
+    st.session_state.live_offset = None
+    st.session_state.live_windows = pd.DataFrame()
+    st.session_state.live_bored = False
+
+live_mode = st.toggle("📡 Live capture", key="live_mode")
+
+if live_mode:
+    live_dashboard()
+    predict_btn = False
+else:
+    col1, col2 = st.columns([1, 1], gap="large")
+
+    with col1:
+        st.markdown('<div class="neuro-card">', unsafe_allow_html=True)
+        blink_count = st.number_input("Blink Count", min_value=0, max_value=100, value=10, key="blink")
+        yawn_count = st.number_input("Yawn Count", min_value=0, max_value=50, value=2, key="yawn")
+        gaze_on_screen = st.slider("Gaze on Screen (%)", min_value=0, max_value=100, value=75, key="gaze")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    with col2:
+        st.markdown('<div class="neuro-card">', unsafe_allow_html=True)
+        head_movement = st.number_input("Head Movements", min_value=0, max_value=100, value=5, key="head")
+        emotion = st.selectbox("Emotional State", ["happy", "neutral", "sad", "tired"], key="emotion")
+        head_pose = st.selectbox("Head Position", ["center", "down", "left", "right", "up"], key="pose")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    col_a, col_b, col_c = st.columns([1, 2, 1])
+    with col_b:
+        predict_btn = st.button("🔍 Detect Boredom Level")
 
 if predict_btn:
     with st.spinner("🧠 Analyzing behavioral patterns..."):
@@ -0,0 +1,53 @@
+# features.py
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# the window schema lives next to capture.py so capture, training and the app share it
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from schema import (WINDOW_SEC, emotion_map, pose_cols, feature_order, status_map,
+                    emotion_codes, head_pose_codes, model_matrix, capture_matrix)
+
+numerical_cols = ["blink_rate", "yawn_count", "gaze_on_screen", "head_movement"]
+categorical_cols = ["emotion", "head_pose"]
+
+
+def clean_dataset(df):
+    """Apply the cleaning steps from the training notebook to a raw fyp_dataset frame."""
+    df = df.copy()
+
+    for col in numerical_cols:
+        if df[col].isnull().sum() > 0:
+            df[col] = df[col].fillna(df[col].median())
+    for col in categorical_cols:
+        if df[col].isnull().sum() > 0:
+            df[col] = df[col].fillna(df[col].mode()[0])
+
+    df.loc[df["gaze_on_screen"] > 100, "gaze_on_screen"] = 100
+
+    # cap extreme outliers at 3 * IQR
+    for col in numerical_cols:
+        q1 = df[col].quantile(0.25)
+        q3 = df[col].quantile(0.75)
+        iqr = q3 - q1
+        df[col] = df[col].clip(lower=q1 - 3 * iqr, upper=q3 + 3 * iqr)
+
+    df = df.drop_duplicates()
+
+    # bore + not_detected -> tired, engaged + not_detected -> neutral
+    not_detected = df["emotion"] == "not_detected"
+    bore = df["status"] == "bore"
+    df.loc[not_detected & bore, "emotion"] = "tired"
+    df.loc[not_detected & ~bore, "emotion"] = "neutral"
+    return df
+
+
+def encode_dataset(df):
+    """Encode a cleaned frame into (X, y) using the same layout as predict_attention."""
+    X = model_matrix(df["blink_rate"].to_numpy(np.float64), df["yawn_count"].to_numpy(np.float64),
+                     df["gaze_on_screen"].to_numpy(np.float64), df["head_movement"].to_numpy(np.float64),
+                     emotion_codes(df["emotion"].to_numpy()), head_pose_codes(df["head_pose"].to_numpy()))
+    y = df["status"].map(status_map)
+    return pd.DataFrame(X, columns=feature_order, index=df.index), y.astype(np.int8)
@@ -0,0 +1,53 @@
+# kernel_model.py
+import numpy as np
+
+
+class NystroemLinear:
+    """
+    A fitted Nystroem RBF map followed by a binary linear classifier, evaluated
+    as one NumPy expression. The map's normalization and the classifier weights
+    are folded into a single weight per landmark, so a prediction is the RBF
+    kernel against the landmarks and one dot product, without the per-step input
+    validation that makes a sklearn Pipeline slow on single rows.
+    Build it with from_pipeline(); it has the predict / predict_proba /
+    decision_function interface the app and train.evaluate() use.
+    """
+
+    def __init__(self, components, gamma, weights, intercept, classes):
+        self.components = np.ascontiguousarray(components, dtype=np.float64)
+        self.gamma = float(gamma)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.classes_ = np.asarray(classes)
+        self._sq_norms = np.einsum("ij,ij->i", self.components, self.components)
+
+    @classmethod
+    def from_pipeline(cls, pipe):
+        """From a fitted Pipeline of ("nystroem", Nystroem(kernel="rbf")) and ("clf", binary linear classifier)."""
+        nystroem, clf = pipe.named_steps["nystroem"], pipe.named_steps["clf"]
+        components = nystroem.components_
+        gamma = nystroem.gamma if nystroem.gamma is not None else 1.0 / components.shape[1]
+        # transform(X) = K(X, components) @ normalization_.T, then decision = transform(X) @ coef_.T + intercept_
+        weights = nystroem.normalization_.T @ clf.coef_.ravel()
+        return cls(components, gamma, weights, clf.intercept_[0], clf.classes_)
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        # squared distances to the landmarks, expanded so batches stay one matrix product
+        d = X @ self.components.T
+        d *= -2.0
+        d += np.einsum("ij,ij->i", X, X)[:, None]
+        d += self._sq_norms
+        np.maximum(d, 0.0, out=d)
+        d *= -self.gamma
+        np.exp(d, out=d)
+        return d @ self.weights + self.intercept
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
+
+    def predict_proba(self, X):
+        p = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - p, p])
@@ -0,0 +1,215 @@
+# train.py
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score, classification_report
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from features import clean_dataset, encode_dataset, emotion_map, feature_order
+from kernel_model import NystroemLinear
+
+CACHE_DIR = Path(".cache")
+
+SVM_GRID = {
+    "C": [0.01, 0.1, 1.0, 10.0],
+    "gamma": [0.001, 0.01, 0.1, "scale"],
+}
+
+NYSTROEM_GRID = {
+    "nystroem__n_components": [25, 50, 100],
+    "nystroem__gamma": [0.01, 0.1],
+    "clf__C": [0.1, 1.0, 10.0],
+}
+
+
+def dataset_key(csv_path):
+    """Hash of the raw CSV bytes plus the encoding layout, used as the cache key."""
+    h = hashlib.sha256()
+    with open(csv_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(json.dumps([feature_order, emotion_map]).encode())
+    return h.hexdigest()[:16]
+
+
+def load_encoded(csv_path, cache_dir=CACHE_DIR, use_cache=True):
+    """Return the encoded (X, y) for csv_path, reusing the on-disk cache when the data is unchanged."""
+    cache_path = Path(cache_dir) / f"encoded_{dataset_key(csv_path)}.npz"
+    if use_cache and cache_path.exists():
+        data = np.load(cache_path, allow_pickle=False)
+        return pd.DataFrame(data["X"], columns=feature_order), data["y"]
+
+    X, y = encode_dataset(clean_dataset(pd.read_csv(csv_path)))
+    X_arr, y_arr = X.to_numpy(), y.to_numpy()
+    if use_cache:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_path, X=X_arr, y=y_arr)
+    return pd.DataFrame(X_arr, columns=feature_order), y_arr
+
+
+def split_and_scale(X, y, test_size=0.3, random_state=42):
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y,
+        test_size=test_size,
+        stratify=y,
+        random_state=random_state
+    )
+    scaler = StandardScaler()
+    scaler.fit(X_train)
+    return scaler, X_train, X_test, y_train, y_test
+
+
+def search_svm(X_train_scaled, y_train, n_jobs=-1, cv=5, random_state=42):
+    """Grid-search the RBF SVM in parallel, then refit the best params with probability estimates."""
+    search = GridSearchCV(
+        SVC(kernel="rbf", random_state=random_state),
+        SVM_GRID,
+        scoring="accuracy",
+        cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state),
+        n_jobs=n_jobs,
+        refit=False
+    )
+    search.fit(X_train_scaled, y_train)
+    model = SVC(kernel="rbf", probability=True, random_state=random_state, **search.best_params_)
+    model.fit(X_train_scaled, y_train)
+    return model, search.best_params_, search.best_score_
+
+
+def search_nystroem(X_train_scaled, y_train, n_jobs=-1, cv=5, random_state=42):
+    """
+    Grid-search a Nystroem feature map + logistic regression, whose cost no longer depends on the
+    number of support vectors, and return the best one folded into a NystroemLinear.
+    """
+    pipe = Pipeline([
+        ("nystroem", Nystroem(kernel="rbf", random_state=random_state)),
+        ("clf", LogisticRegression(max_iter=1000)),
+    ])
+    search = GridSearchCV(
+        pipe,
+        NYSTROEM_GRID,
+        scoring="accuracy",
+        cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state),
+        n_jobs=n_jobs,
+        refit=True
+    )
+    search.fit(X_train_scaled, y_train)
+    return NystroemLinear.from_pipeline(search.best_estimator_), search.best_params_, search.best_score_
+
+
+def measure_latency(model, X, repeats=200):
+    """Per-row prediction latency in microseconds: one row at a time, and amortized over a full batch."""
+    row = X[:1]
+    model.predict(row)
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(row)
+    single_us = (time.perf_counter() - t0) / repeats * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(10):
+        model.predict(X)
+    batch_us = (time.perf_counter() - t0) / (10 * len(X)) * 1e6
+    return single_us, batch_us
+
+
+def evaluate(name, model, X_test_scaled, y_test):
+    y_pred = model.predict(X_test_scaled)
+    y_proba = model.predict_proba(X_test_scaled)[:, 1]
+    single_us, batch_us = measure_latency(model, X_test_scaled)
+    entry = {
+        "variant": name,
+        "accuracy": round(float(accuracy_score(y_test, y_pred)), 4),
+        "roc_auc": round(float(roc_auc_score(y_test, y_proba)), 4),
+        "single_row_us": round(single_us, 2),
+        "batch_row_us": round(batch_us, 3),
+    }
+    if hasattr(model, "support_vectors_"):
+        entry["n_support_vectors"] = int(len(model.support_vectors_))
+    return entry
+
+
+def recommend(entries, tolerance=0.01):
+    """Fastest variant for single-row and for batch scoring among those within `tolerance` of the best accuracy."""
+    best = max(e["accuracy"] for e in entries)
+    candidates = [e for e in entries if e["accuracy"] >= best - tolerance]
+    return {
+        "single_row": min(candidates, key=lambda e: e["single_row_us"])["variant"],
+        "batch": min(candidates, key=lambda e: e["batch_row_us"])["variant"],
+    }
+
+
+def write_report(entries, test_rows, path):
+    recommended = recommend(entries)
+    with open(path, "w") as f:
+        json.dump({"test_rows": test_rows, "variants": entries, "recommended": recommended}, f, indent=2)
+    print(f"\n{'variant':<8} {'accuracy':>9} {'roc_auc':>8} {'1-row us':>10} {'batch us/row':>13}")
+    for e in entries:
+        print(f"{e['variant']:<8} {e['accuracy']:>9.3f} {e['roc_auc']:>8.3f} "
+              f"{e['single_row_us']:>10.1f} {e['batch_row_us']:>13.3f}")
+    print(f"Recommended: {recommended['single_row']} for single rows, {recommended['batch']} for batches")
+    print("Report saved to", path)
+
+
+def run_training(data_path="fyp_dataset.csv", out_path="svm_with_scaler.pkl", n_jobs=-1, cv=5,
+                 cache_dir=CACHE_DIR, use_cache=True, nystroem_out_path="nystroem_with_scaler.pkl",
+                 report_path="model_report.json"):
+    t0 = time.time()
+    X, y = load_encoded(data_path, cache_dir, use_cache)
+    scaler, X_train, X_test, y_train, y_test = split_and_scale(X, y)
+    X_train_scaled = scaler.transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    print(f"Loaded {len(X)} rows ({time.time() - t0:.2f}s)")
+
+    t0 = time.time()
+    model, best_params, cv_score = search_svm(X_train_scaled, y_train, n_jobs, cv)
+    print(f"Best params: {best_params} (cv accuracy {cv_score:.3f}, {time.time() - t0:.2f}s)")
+
+    y_pred = model.predict(X_test_scaled)
+    y_proba = model.predict_proba(X_test_scaled)[:, 1]
+    print(f"Accuracy : {accuracy_score(y_test, y_pred):.3f}")
+    print(f"ROC AUC  : {roc_auc_score(y_test, y_proba):.3f}")
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred))
+
+    joblib.dump({"model": model, "scaler": scaler}, out_path)
+    print("Model saved to", out_path)
+
+    if nystroem_out_path:
+        t0 = time.time()
+        ny_model, ny_params, ny_cv = search_nystroem(X_train_scaled, y_train, n_jobs, cv)
+        print(f"Nystroem variant params: {ny_params} (cv accuracy {ny_cv:.3f}, {time.time() - t0:.2f}s)")
+        joblib.dump({"model": ny_model, "scaler": scaler}, nystroem_out_path)
+        print("Nystroem model saved to", nystroem_out_path)
+
+        entries = [evaluate("svm", model, X_test_scaled, y_test),
+                   evaluate("nystroem", ny_model, X_test_scaled, y_test)]
+        write_report(entries, len(y_test), report_path)
+    return model, scaler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", type=str, default="fyp_dataset.csv", help="Training dataset CSV")
+    parser.add_argument("--out", type=str, default="svm_with_scaler.pkl", help="Output model bundle path")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel jobs for the grid search (-1 = all cores)")
+    parser.add_argument("--cv", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument("--nystroem-out", type=str, default="nystroem_with_scaler.pkl",
+                        help="Output path for the Nystroem variant")
+    parser.add_argument("--no-nystroem", action="store_true", help="Skip training the Nystroem variant")
+    parser.add_argument("--report", type=str, default="model_report.json", help="Accuracy/latency report path")
+    parser.add_argument("--cache-dir", type=str, default=str(CACHE_DIR), help="Encoded feature cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="Re-encode the dataset and skip the cache")
+    args = parser.parse_args()
+    run_training(args.data, args.out, args.n_jobs, args.cv, args.cache_dir, not args.no_cache,
+                 None if args.no_nystroem else args.nystroem_out, args.report)
@@ -0,0 +1,419 @@
+# benchmark.py
+"""
+Headless benchmarks for the feature and window pipeline.
+
+    python benchmark.py                      # run and compare with bench_baseline.json
+    python benchmark.py --save               # run and store the results as the new baseline
+    python benchmark.py --fixture lm.npy     # use recorded landmarks (N x 478 x 2/3, normalized)
+
+Landmark fixtures are synthetic and seeded, so results are comparable between
+runs on the same machine. No camera, display or GPU is used.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+import cv2
+
+from utils import (eye_aspect_ratio, mouth_aspect_ratio, compute_gaze_ratio, head_pose,
+                   landmarks_to_array, face_bbox,
+                   LEFT_EYE_IDX, RIGHT_EYE_IDX, LEFT_IRIS_IDX, RIGHT_IRIS_IDX,
+                   MOUTH_TOP, MOUTH_BOTTOM, MOUTH_LEFT, MOUTH_RIGHT)
+from window import WindowAggregator
+from events import blink_detector, yawn_detector
+from config import DEFAULTS
+
+BASELINE_PATH = Path('bench_baseline.json')
+MODEL_PATH = Path('Tabular Model') / 'svm_with_scaler.pkl'
+IMG_W, IMG_H = 640, 480
+N_LANDMARKS = 478
+
+
+def _eye_points(cx, cy, width, ear):
+    """Six EAR-ordered points (corner, top, top, corner, bottom, bottom) for an eye with the given EAR."""
+    half_h = ear * width / 2.0
+    return [(cx - width / 2, cy), (cx - width / 6, cy - half_h), (cx + width / 6, cy - half_h),
+            (cx + width / 2, cy), (cx + width / 6, cy + half_h), (cx - width / 6, cy + half_h)]
+
+
+def synthetic_landmarks(n_frames=300, seed=0):
+    """
+    Array of shape (n_frames, 478, 2) with normalized coordinates. The pose
+    landmarks follow the 3D model used by utils.head_pose, eyes/mouth have
+    realistic EAR/MAR, and a blink happens every ~3 seconds at 30 FPS.
+    """
+    rng = np.random.default_rng(seed)
+    cx, cy, s = IMG_W / 2, IMG_H / 2, 0.45  # face centre in pixels, pixels per model unit
+    base = np.empty((N_LANDMARKS, 2))
+    base[:, 0] = rng.uniform(cx - 220 * s, cx + 220 * s, N_LANDMARKS)
+    base[:, 1] = rng.uniform(cy - 250 * s, cy + 330 * s, N_LANDMARKS)
+
+    pose = {1: (0.0, 0.0), 199: (0.0, -330.0), 33: (-225.0, 170.0), 263: (225.0, 170.0),
+            61: (-150.0, -150.0), 291: (150.0, -150.0)}
+    for idx, (mx, my) in pose.items():
+        base[idx] = (cx + mx * s, cy - my * s)
+    base[MOUTH_LEFT] = (cx - 140 * s, cy + 150 * s)
+    base[MOUTH_RIGHT] = (cx + 140 * s, cy + 150 * s)
+    base[MOUTH_TOP] = (cx, cy + 135 * s)
+    base[MOUTH_BOTTOM] = (cx, cy + 165 * s)
+
+    eye_w = 110 * s
+    eye_y = cy - 170 * s
+    eyes = ((LEFT_EYE_IDX, LEFT_IRIS_IDX, cx - 225 * s + eye_w / 2),
+            (RIGHT_EYE_IDX, RIGHT_IRIS_IDX, cx + 225 * s - eye_w / 2))
+
+    frames = np.repeat(base[None], n_frames, axis=0)
+    for i in range(n_frames):
+        ear = 0.08 if i % 90 in (0, 1, 2) else 0.3
+        for eye_idx, iris_idx, ex in eyes:
+            frames[i, eye_idx] = _eye_points(ex, eye_y, eye_w, ear)
+            r = eye_w / 8
+            frames[i, iris_idx] = [(ex + r, eye_y), (ex, eye_y + r), (ex - r, eye_y), (ex, eye_y - r)]
+    frames += rng.normal(0, 0.3, frames.shape)
+    frames /= (IMG_W, IMG_H)
+    return frames
+
+
+def load_fixture(path):
+    frames = np.load(path)
+    if frames.ndim != 3 or frames.shape[1] < N_LANDMARKS:
+        raise ValueError('fixture must have shape (frames, 478, 2|3)')
+    return frames[:, :, :2]
+
+
+def as_mediapipe(frames):
+    """Wrap landmark arrays as MediaPipe-like objects with .x/.y, the form capture passes to utils."""
+    return [[SimpleNamespace(x=float(x), y=float(y)) for x, y in frame] for frame in frames]
+
+
+def _time(fn, n_ops, repeat=5, min_time=0.2):
+    """
+    Best-of-`repeat` ops/sec for fn(), which performs n_ops operations per call.
+    Each measurement loops fn() until it takes at least `min_time` seconds.
+    """
+    fn()
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return n_ops * loops / best
+
+
+def _peak_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024.0
+
+
+def bench_features(lms):
+    def ear():
+        for lm in lms:
+            eye_aspect_ratio(lm, LEFT_EYE_IDX, IMG_W, IMG_H)
+            eye_aspect_ratio(lm, RIGHT_EYE_IDX, IMG_W, IMG_H)
+
+    def mar():
+        for lm in lms:
+            mouth_aspect_ratio(lm, IMG_W, IMG_H)
+
+    def gaze():
+        for lm in lms:
+            compute_gaze_ratio(lm, IMG_W, IMG_H)
+
+    def pose():
+        for lm in lms:
+            head_pose(lm, IMG_W, IMG_H)
+
+    return {'eye_aspect_ratio': (ear, len(lms)),
+            'mouth_aspect_ratio': (mar, len(lms)),
+            'compute_gaze_ratio': (gaze, len(lms)),
+            'head_pose': (pose, len(lms))}
+
+
+def bench_window(lms):
+    """One capture window: thresholding, gaze/pose bookkeeping and the rate summary."""
+    cfg = DEFAULTS
+    feats = []
+    for lm in lms:
+        ear = (eye_aspect_ratio(lm, LEFT_EYE_IDX, IMG_W, IMG_H) +
+               eye_aspect_ratio(lm, RIGHT_EYE_IDX, IMG_W, IMG_H)) / 2.0
+        feats.append((ear, mouth_aspect_ratio(lm, IMG_W, IMG_H),
+                      compute_gaze_ratio(lm, IMG_W, IMG_H), head_pose(lm, IMG_W, IMG_H)[1]))
+    win = WindowAggregator(cfg['window_sec'])
+
+    def run():
+        win.reset()
+        blinks = blink_detector(cfg)
+        yawns = yawn_detector(cfg)
+        for i, (ear, mar, g, label) in enumerate(feats):
+            t_ms = i * 1000.0 / 30
+            win.total_frames += 1
+            win.face_present_count += 1
+            if blinks.update(ear, t_ms):
+                win.blink_count += 1
+            if yawns.update(mar, t_ms):
+                win.yawn_count += 1
+            if g is not None and abs(g) < cfg['gaze_threshold']:
+                win.gaze_on_count += 1
+            win.add_head_label(label)
+        return win.rates()
+
+    return {'window_aggregation': (run, len(feats))}
+
+
+def bench_model(n_rows=500):
+    try:
+        import joblib
+        import pandas as pd
+        with warnings.catch_warnings():
+            # the bundle may have been pickled by a different scikit-learn version
+            warnings.simplefilter('ignore')
+            bundle = joblib.load(MODEL_PATH)
+    except Exception as e:
+        print('skipping svm_predict:', e)
+        return {}
+    model, scaler = bundle['model'], bundle['scaler']
+    cols = list(getattr(scaler, 'feature_names_in_', range(scaler.n_features_in_)))
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(n_rows, len(cols)))
+    row = pd.DataFrame(X[:1], columns=cols)
+    batch = pd.DataFrame(X, columns=cols)
+
+    def single():
+        for _ in range(50):
+            model.predict(scaler.transform(row))
+
+    def batched():
+        model.predict(scaler.transform(batch))
+
+    return {'svm_predict_row': (single, 50), 'svm_predict_batch': (batched, n_rows)}
+
+
+def bench_writes(tmp, n_rows=1000):
+    """Output write patterns; files go to the directory `tmp`, which the caller removes."""
+    tmp = Path(tmp)
+    rng = np.random.default_rng(2)
+    ts = np.arange(n_rows, dtype=np.int64) + 1_700_000_000
+    values = rng.random((n_rows, 4))
+    rows = [[int(t), '', 'neutral', *map(float, v), 'center'] for t, v in zip(ts, values)]
+
+    def csv_append():
+        # capture's pattern: reopen the file for every window
+        path = tmp / 'append.csv'
+        for row in rows:
+            with open(path, 'a', newline='') as f:
+                csv.writer(f).writerow(row)
+        os.remove(path)
+
+    def csv_batch():
+        path = tmp / 'batch.csv'
+        with open(path, 'w', newline='') as f:
+            csv.writer(f).writerows(rows)
+        os.remove(path)
+
+    def columnar():
+        path = tmp / 'cols.npz'
+        np.savez(path, timestamp=ts, values=values)
+        os.remove(path)
+
+    return {'csv_append_row': (csv_append, n_rows),
+            'csv_write_batch': (csv_batch, n_rows),
+            'columnar_npz_write': (columnar, n_rows)}
+
+
+def _capture_step(state, image, lm):
+    """The per-frame work of capture's inline path, with its reused buffers kept in `state`."""
+    cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=state['rgb'])
+    arr = state['lm'] = landmarks_to_array(lm, state['lm'])
+    eye_aspect_ratio(arr, LEFT_EYE_IDX, IMG_W, IMG_H)
+    eye_aspect_ratio(arr, RIGHT_EYE_IDX, IMG_W, IMG_H)
+    mouth_aspect_ratio(arr, IMG_W, IMG_H)
+    compute_gaze_ratio(arr, IMG_W, IMG_H)
+    state['win'].add_head_label(head_pose(arr, IMG_W, IMG_H)[1])
+    box = face_bbox(arr, IMG_W, IMG_H)
+    if box is not None:
+        xmin, ymin, xmax, ymax = box
+        state['win'].add_face((xmax - xmin) * (ymax - ymin), image[ymin:ymax, xmin:xmax])
+
+
+def bench_capture_loop(lms):
+    image = np.random.default_rng(3).integers(0, 256, (IMG_H, IMG_W, 3), dtype=np.uint8)
+    state = {'rgb': np.empty_like(image), 'lm': None, 'win': WindowAggregator(DEFAULTS['window_sec'])}
+
+    def run():
+        state['win'].reset()
+        for lm in lms:
+            _capture_step(state, image, lm)
+
+    return {'capture_frame': (run, len(lms))}
+
+
+def capture_alloc_peak(lms):
+    """
+    KiB allocated at peak by one window of the capture loop after a warm-up
+    window, above what was live when the window started. With the buffers
+    reused this stays at a few KiB of small objects; a per-frame copy of a
+    640x480 frame (900 KiB) or per-frame landmark lists show up here.
+    """
+    image = np.random.default_rng(3).integers(0, 256, (IMG_H, IMG_W, 3), dtype=np.uint8)
+    state = {'rgb': np.empty_like(image), 'lm': None, 'win': WindowAggregator(DEFAULTS['window_sec'])}
+    tracemalloc.start()
+    try:
+        for warm_up in (True, False):
+            if not warm_up:
+                tracemalloc.reset_peak()
+                start, _ = tracemalloc.get_traced_memory()
+            state['win'].reset()
+            for lm in lms:
+                _capture_step(state, image, lm)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - start) / 1024.0
+
+
+def synthetic_ear(fps, blink_ms, shape='step', n_blinks=200, seed=0, open_ear=0.30, closed_ear=0.08, noise=0.01):
+    """
+    (timestamps in ms, EAR) sampled at `fps` with one blink of `blink_ms` per
+    second at a random phase to the frames. A 'step' blink drops straight to
+    `closed_ear`; a 'v' blink closes and reopens linearly over `blink_ms`.
+    """
+    rng = np.random.default_rng(seed)
+    starts = np.arange(n_blinks) * 1000.0 + 500.0 + rng.uniform(0, 500.0, n_blinks)
+    t = np.arange(0.0, n_blinks * 1000.0 + 1000.0, 1000.0 / fps) + rng.uniform(0, 1000.0 / fps)
+    ear = np.full(t.shape, open_ear)
+    for start in starts:
+        inside = (t >= start) & (t < start + blink_ms)
+        if shape == 'step':
+            ear[inside] = closed_ear
+        else:
+            x = (t[inside] - start) / blink_ms
+            ear[inside] = open_ear - (open_ear - closed_ear) * (1.0 - np.abs(2.0 * x - 1.0))
+    return t, ear + rng.normal(0, noise, t.shape)
+
+
+# blinks whose below-threshold part is well past blink_min_ms, so every frame rate should count all of them
+BLINK_SWEEP_CASES = (('step', 100), ('step', 150), ('step', 200), ('step', 300), ('v', 150), ('v', 200), ('v', 300))
+BLINK_SWEEP_FPS = (10, 15, 30, 60)
+
+
+def blink_fps_sweep(cfg, n_blinks=200):
+    """{(shape, blink_ms): {fps: blinks counted}} for the blink detector built from `cfg`."""
+    counts = {}
+    for shape, blink_ms in BLINK_SWEEP_CASES:
+        counts[shape, blink_ms] = {}
+        for fps in BLINK_SWEEP_FPS:
+            t, ear = synthetic_ear(fps, blink_ms, shape, n_blinks)
+            detector = blink_detector(cfg)
+            counts[shape, blink_ms][fps] = sum(detector.update(v, t_ms) for t_ms, v in zip(t.tolist(), ear.tolist()))
+    return counts
+
+
+def run_all(frames, repeat=5):
+    lms = as_mediapipe(frames)
+    cases = {}
+    cases.update(bench_features(lms))
+    cases.update(bench_window(lms))
+    cases.update(bench_capture_loop(lms))
+    cases.update(bench_model())
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench_') as tmp:
+        cases.update(bench_writes(tmp))
+        for name, (fn, n_ops) in cases.items():
+            results[name] = {
+                'ops_per_sec': round(_time(fn, n_ops, repeat), 1),
+                'peak_kib': round(_peak_kib(fn), 1),
+            }
+            print('{:<22} {:>14,.1f} ops/s {:>10.1f} KiB peak'.format(
+                name, results[name]['ops_per_sec'], results[name]['peak_kib']))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Names of benchmarks whose throughput dropped by more than `threshold` (fraction) vs the baseline."""
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        change = res['ops_per_sec'] / base['ops_per_sec'] - 1.0
+        flag = ''
+        if change < -threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('{:<22} {:>+8.1%}{}'.format(name, change, flag))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixture', type=str, default=None, help='Recorded landmarks (.npy, frames x 478 x 2|3)')
+    parser.add_argument('--frames', type=int, default=300, help='Synthetic frames (one 10 s window at 30 FPS)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is kept)')
+    parser.add_argument('--baseline', type=str, default=str(BASELINE_PATH), help='Baseline JSON path')
+    parser.add_argument('--save', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown before flagging (0.2 = 20%%)')
+    parser.add_argument('--max-alloc', type=float, default=32.0,
+                        help='Allowed peak allocation (KiB) during a steady-state capture window')
+    args = parser.parse_args()
+
+    frames = load_fixture(args.fixture) if args.fixture else synthetic_landmarks(args.frames)
+    results = run_all(frames, args.repeat)
+    alloc = capture_alloc_peak(as_mediapipe(frames))
+    print('{:<22} {:>14.1f} KiB peak in a steady-state window'.format('capture_alloc_peak', alloc))
+    allocating = alloc > args.max_alloc
+    if allocating:
+        print('capture loop allocates per frame: {:.1f} KiB > {:.1f} KiB'.format(alloc, args.max_alloc))
+
+    # blink counts must not depend on the frame rate: 15 FPS has to match 60 FPS
+    n_blinks = 200
+    print('\n{:<12}'.format('blinks/{}'.format(n_blinks)) + ''.join('{:>8}'.format('{} fps'.format(f)) for f in BLINK_SWEEP_FPS))
+    fps_dependent = False
+    for (shape, blink_ms), by_fps in blink_fps_sweep(DEFAULTS, n_blinks).items():
+        flag = ''
+        if by_fps[15] != by_fps[60]:
+            fps_dependent = True
+            flag = '  FPS-DEPENDENT'
+        print('{:<12}'.format('{} {} ms'.format(shape, blink_ms)) +
+              ''.join('{:>8}'.format(by_fps[f]) for f in BLINK_SWEEP_FPS) + flag)
+
+    baseline_path = Path(args.baseline)
+    if args.save:
+        with open(baseline_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'machine': platform.machine(),
+                       'frames': len(frames), 'results': results}, f, indent=2)
+        print('Baseline saved to', baseline_path)
+    elif baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print('\nvs baseline', baseline_path)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+    if allocating or fps_dependent:
+        sys.exit(1)
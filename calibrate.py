@@ -4,25 +4,106 @@ import argparse
 import json
 import cv2
 import mediapipe as mp
-import numpy as np
 from utils import eye_aspect_ratio, mouth_aspect_ratio, compute_gaze_ratio, LEFT_EYE_IDX, RIGHT_EYE_IDX
 from config import DEFAULTS, save_config
-
-
-def run_calibration(duration_sec=30, out_path='config.json'):
+from profiles import ProfileStore, PROFILE_DIR
+from streaming import P2Quantile, ConvergenceMonitor
+
+
+def thresholds_from_stats(ear_median=None, mar_median=None, gaze_median=None):
+    thresholds = {}
+    if ear_median is not None:
+        thresholds['ear_blink_thresh'] = max(0.12, ear_median * 0.7)
+    if mar_median is not None:
+        thresholds['mar_yawn_thresh'] = max(0.45, mar_median * 1.5)
+    if gaze_median is not None:
+        thresholds['gaze_threshold'] = max(0.15, gaze_median * 1.2)
+    return thresholds
+
+
+class AutoCalibrator:
+    """
+    Keeps thresholds calibrated while capture runs. Medians of the open-eye EAR
+    and resting MAR are tracked over each `interval` seconds, and the thresholds
+    move toward thresholds_from_stats() by at most `max_step` (relative) per update.
+    """
+
+    def __init__(self, interval=30, max_step=0.05, min_samples=100):
+        self.interval = interval
+        self.max_step = max_step
+        self.min_samples = min_samples
+        self.ear = P2Quantile(0.5)
+        self.mar = P2Quantile(0.5)
+        self.last_update = None
+
+    def add(self, ear, mar, cfg):
+        # blink and yawn frames are left out so the medians match what calibration measures
+        if ear is not None and ear >= cfg['ear_blink_thresh']:
+            self.ear.add(ear)
+        if mar is not None and mar <= cfg['mar_yawn_thresh']:
+            self.mar.add(mar)
+
+    def update(self, cfg, now):
+        """Adjust cfg in place once per interval; returns [(key, old, new), ...] for changed thresholds."""
+        if self.last_update is None:
+            self.last_update = now
+        if now - self.last_update < self.interval:
+            return []
+        self.last_update = now
+
+        targets = thresholds_from_stats(
+            self.ear.value() if self.ear.count >= self.min_samples else None,
+            self.mar.value() if self.mar.count >= self.min_samples else None)
+        self.ear.reset()
+        self.mar.reset()
+
+        changes = []
+        for key, target in targets.items():
+            old = cfg[key]
+            new = min(max(target, old * (1 - self.max_step)), old * (1 + self.max_step))
+            # small deadband so sampling noise doesn't log a change every interval
+            if abs(new - old) > 0.005 * old:
+                cfg[key] = new
+                changes.append((key, old, new))
+        return changes
+
+
+def run_calibration(duration_sec=30, out_path='config.json', user_id=None, profile_dir=PROFILE_DIR,
+                    source=0, tol=0.01, min_duration=5, show=True):
+    """
+    Calibrate thresholds from `source` (camera index or video path). Medians are
+    tracked with constant-memory P-square estimators and calibration stops early
+    once all of them are stable within `tol`; `duration_sec` is the upper bound.
+    """
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        print('Could not open {}; calibration aborted'.format(source))
+        return None
     mp_face = mp.solutions.face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True)
-    cap = cv2.VideoCapture(0)
+    from_video = isinstance(source, str)
     t0 = time.time()
-    e_ears = []
-    e_mars = []
-    gaze_offsets = []
+    ear_med = P2Quantile(0.5)
+    mar_med = P2Quantile(0.5)
+    gaze_med = P2Quantile(0.5)
+    monitor = ConvergenceMonitor(tol=tol)
+    next_check = min_duration
+    elapsed = 0.0
 
-    print('Calibration started — please look at the screen naturally for {} seconds'.format(duration_sec))
+    print('Calibration started — please look at the screen naturally for up to {} seconds'.format(duration_sec))
 
-    while time.time() - t0 < duration_sec:
+    while elapsed < duration_sec:
         ret, frame = cap.read()
+        # the camera runs on the wall clock even when reads fail, so a stalled camera can't hang calibration
+        if not from_video:
+            elapsed = time.time() - t0
         if not ret:
+            if from_video:
+                break
+            time.sleep(0.01)
             continue
+        # recorded video runs on its own clock so results don't depend on decode speed
+        if from_video:
+            elapsed = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
 
         h, w = frame.shape[:2]
         rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -35,53 +116,84 @@ def run_calibration(duration_sec=30, out_path='config.json'):
             left_ear = eye_aspect_ratio(lm, LEFT_EYE_IDX, w, h)
             right_ear = eye_aspect_ratio(lm, RIGHT_EYE_IDX, w, h)
             if left_ear is not None and right_ear is not None:
-                e_ears.append((left_ear + right_ear) / 2.0)
+                ear_med.add((left_ear + right_ear) / 2.0)
 
             # Calculate mouth aspect ratio
             mar = mouth_aspect_ratio(lm, w, h)
             if mar is not None:
-                e_mars.append(mar)
+                mar_med.add(mar)
 
             # Calculate gaze ratio
             try:
                 g = compute_gaze_ratio(lm, w, h)
                 if g is not None:
-                    gaze_offsets.append(abs(g))
+                    gaze_med.add(abs(g))
             except Exception:
                 pass
 
-        # Display countdown
-        time_left = max(0, duration_sec - (time.time() - t0))
-        cv2.putText(frame, 'Calibrating: {:.0f}s left'.format(time_left),
-                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        # Stop early once the medians have settled
+        if elapsed >= next_check:
+            next_check = elapsed + 0.5
+            if ear_med.count >= 30 and monitor.update((ear_med.value(), mar_med.value(), gaze_med.value())):
+                print('Estimates converged after {:.1f}s'.format(elapsed))
+                break
+
+        if show:
+            # Display countdown
+            time_left = max(0, duration_sec - elapsed)
+            cv2.putText(frame, 'Calibrating: {:.0f}s left'.format(time_left),
+                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
 
-        cv2.imshow('Calibration', frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+            cv2.imshow('Calibration', frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
 
     cap.release()
-    cv2.destroyAllWindows()
+    if show:
+        cv2.destroyAllWindows()
 
     # Calculate calibration values
-    ear_mean = float(np.median(e_ears)) if e_ears else DEFAULTS['ear_blink_thresh']
-    mar_mean = float(np.median(e_mars)) if e_mars else DEFAULTS['mar_yawn_thresh']
-    gaze_median = float(np.median(gaze_offsets)) if gaze_offsets else DEFAULTS['gaze_threshold']
+    ear_mean = ear_med.value() if ear_med.count else DEFAULTS['ear_blink_thresh']
+    mar_mean = mar_med.value() if mar_med.count else DEFAULTS['mar_yawn_thresh']
+    gaze_median = gaze_med.value() if gaze_med.count else DEFAULTS['gaze_threshold']
 
     # Create configuration with calibrated thresholds
     cfg = DEFAULTS.copy()
-    cfg['ear_blink_thresh'] = max(0.12, ear_mean * 0.7)
-    cfg['mar_yawn_thresh'] = max(0.45, mar_mean * 1.5)
-    cfg['gaze_threshold'] = max(0.15, gaze_median * 1.2)
+    cfg.update(thresholds_from_stats(ear_mean, mar_mean, gaze_median))
+
+    if user_id:
+        # Per-user profile keeps the raw medians next to the thresholds
+        stats = {
+            'ear_median': ear_mean,
+            'mar_median': mar_mean,
+            'gaze_median': gaze_median,
+            'samples': {'ear': ear_med.count, 'mar': mar_med.count, 'gaze': gaze_med.count},
+            'duration_sec': round(elapsed, 1),
+        }
+        store = ProfileStore(profile_dir)
+        profile = store.save(user_id, cfg, stats)
+        print('Calibration completed. Profile saved to', store.path(user_id))
+        print(json.dumps(profile, indent=2))
+        return cfg
 
     # Save configuration
     save_config(out_path, cfg)
     print('Calibration completed. Thresholds saved to', out_path)
     print(json.dumps(cfg, indent=2))
+    return cfg
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('--duration', type=int, default=30, help='Calibration duration in seconds')
+    parser.add_argument('--duration', type=int, default=30, help='Maximum calibration duration in seconds')
+    parser.add_argument('--min-duration', type=float, default=5, help='Minimum seconds before early stopping')
+    parser.add_argument('--tol', type=float, default=0.01, help='Relative tolerance for convergence')
+    parser.add_argument('--video', type=str, default=None, help='Calibrate from a recorded video instead of the camera')
+    parser.add_argument('--no-display', action='store_true', help='Run without a preview window')
     parser.add_argument('--out', type=str, default='config.json', help='Output configuration file path')
+    parser.add_argument('--user', type=str, default=None, help='Save as this user\'s profile instead of the global config')
+    parser.add_argument('--profiles', type=str, default=str(PROFILE_DIR), help='Profile directory')
     args = parser.parse_args()
-    run_calibration(args.duration, args.out)
\ No newline at end of file
+    run_calibration(args.duration, args.out, args.user, args.profiles,
+                    source=args.video if args.video else 0, tol=args.tol,
+                    min_duration=args.min_duration, show=not args.no_display)
\ No newline at end of file
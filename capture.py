@@ -1,25 +1,35 @@
 # capture.py
 
 import time
-import os
+
+T_START = time.perf_counter()
+
 import csv
+import argparse
 from pathlib import Path
 import cv2
 import mediapipe as mp
-from deepface import DeepFace
-from utils import *
+import numpy as np
+import emotion
+from utils import (eye_aspect_ratio, mouth_aspect_ratio, compute_gaze_ratio, head_pose,
+                   landmarks_to_array, face_bbox, LEFT_EYE_IDX, RIGHT_EYE_IDX)
 from config import DEFAULTS, load_config
-import os
-
-os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
-import tensorflow as tf
+from profiles import ProfileStore, PROFILE_DIR
+from calibrate import AutoCalibrator
+from window import WindowAggregator
+from metrics import StageTimer, NullTimer, MetricsWriter
+from profiling import SessionProfiler, PROFILE_MODES
+from frame_ring import FaceMeshWorker
+from snapshots import SnapshotWriter, keep_snapshot
+from events import blink_detector, yawn_detector
+from presence import PresenceGate
+from schema import WINDOW_SEC, WINDOW_COLUMNS, canonical_emotion, canonical_head_pose
 
 OUT_DIR = Path('output')
 IM_DIR = OUT_DIR / 'images'
 CSV_PATH = OUT_DIR / 'data.csv'
-
-OUT_DIR.mkdir(exist_ok=True)
-IM_DIR.mkdir(parents=True, exist_ok=True)
+METRICS_LOG_PATH = OUT_DIR / 'metrics.log'
+METRICS_PROM_PATH = OUT_DIR / 'metrics.prom'
 
 CFG_PATH = Path('config.json')
 config = DEFAULTS.copy()
@@ -31,155 +41,280 @@ if CFG_PATH.exists():
 
 
 def write_csv_header(path):
-    if not path.exists():
-        with open(path, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['timestamp', 'face_image', 'emotion', 'blink_rate', 'yawn_rate', 'gaze_ratio', 'head_pose',
-                             'head_movement_rate'])
+    if path.exists():
+        with open(path, newline='') as f:
+            header = next(csv.reader(f), None)
+        if header == WINDOW_COLUMNS:
+            return
+        # written with an older column layout; keep it aside instead of mixing layouts in one file
+        old = path.with_name('{}_{}{}'.format(path.stem, int(path.stat().st_mtime), path.suffix))
+        path.rename(old)
+        print('Moved {} with an old header to {}'.format(path, old))
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(WINDOW_COLUMNS)
 
 
-def main():
-    write_csv_header(CSV_PATH)
-    mp_face = mp.solutions.face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True)
-    cap = cv2.VideoCapture(0)
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    window_sec = config.get('window_sec', 10)
+def main(user_id=None, profile_dir=PROFILE_DIR, instrument=None, source=0, headless=False, profiler=None,
+         facemesh_worker=None):
+    # DeepFace/tensorflow load in the background while the camera starts
+    emotion.warm_up()
+    print('Imports done in {:.2f}s'.format(time.perf_counter() - T_START))
 
-    ear_ema = None
-    mar_ema = None
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    write_csv_header(CSV_PATH)
+    profiles = ProfileStore(profile_dir, base_config=config)
+    last_active = profiles.active_user()
+    user_id = user_id or last_active
+    cfg = profiles.config_for(user_id)
+    if user_id:
+        print('Using calibration profile:', user_id)
+    # face crops are encoded and written off the capture thread
+    snapshots = SnapshotWriter(IM_DIR, quality=cfg.get('snapshot_quality', 90),
+                               max_side=cfg.get('snapshot_max_side', 0),
+                               max_count=cfg.get('snapshot_max_count', 0), max_mb=cfg.get('snapshot_max_mb', 0),
+                               archive=cfg.get('snapshot_archive', False),
+                               segment_mb=cfg.get('snapshot_segment_mb', 64))
+    autocal = None
+    if cfg.get('auto_calibrate', True):
+        autocal = AutoCalibrator(cfg.get('auto_calib_interval', 30), cfg.get('auto_calib_max_step', 0.05))
 
-    blink_count = 0
-    blink_in_progress = False
-    yawn_count = 0
-    yawn_in_progress = False
+    # FaceMesh either inline or in a worker process fed through a shared-memory frame ring
+    if facemesh_worker is None:
+        facemesh_worker = cfg.get('facemesh_worker', False)
+    worker = None
+    mp_face = None
+    if facemesh_worker:
+        worker = FaceMeshWorker(slots=cfg.get('ring_slots', 4))
+    else:
+        mp_face = mp.solutions.face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True)
+    # Preallocated per-frame buffers: grab targets (one per frame the worker can hold
+    # in flight, plus the one being grabbed), the RGB conversion and the landmark array
+    frame_bufs = [None] * (worker.depth + 1 if worker is not None else 1)
+    slot = 0
+    rgb = None
+    lm_arr = None
+    cap = cv2.VideoCapture(source)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    # offline mode: windows follow the video's own clock, anchored at the time processing started
+    from_video = isinstance(source, str)
+    t_open = time.time()
+    if from_video:
+        clock = lambda: t_open + cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+    else:
+        clock = time.time
+    print('Camera opened {:.2f}s after start'.format(time.perf_counter() - T_START))
+    window_sec = cfg.get('window_sec', WINDOW_SEC)
 
-    gaze_on_count = 0
-    face_present_count = 0
-    total_frames = 0
+    # per-stage timings; NullTimer keeps the calls in place at no measurable cost
+    if instrument is None:
+        instrument = cfg.get('instrument', False)
+    timer = StageTimer() if instrument else NullTimer()
+    metrics_writer = None
+    if instrument:
+        metrics_writer = MetricsWriter(timer, METRICS_LOG_PATH, METRICS_PROM_PATH, cfg.get('metrics_interval', 10))
 
-    head_last_label = None
-    head_movement_count = 0
+    # skip conversion and FaceMesh while nobody is in front of the camera
+    gate = None
+    if cfg.get('presence_gate', True):
+        gate = PresenceGate(cfg.get('presence_min_brightness', 20), cfg.get('presence_motion', 6.0),
+                            cfg.get('presence_probe_every', 15), cfg.get('presence_absent_after', 15))
 
-    candidate_faces = []
+    # hysteresis + duration checks on time-smoothed EAR/MAR, independent of the frame rate
+    blinks = blink_detector(cfg)
+    yawns = yawn_detector(cfg)
 
-    window_start = time.time()
+    win = WindowAggregator(window_sec)
+    window_start = clock()
     frame_idx = 0
 
-    print("Starting capture. Press 'q' in the window to stop.")
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            time.sleep(0.01)
-            continue
-        frame_idx += 1
-        h, w = frame.shape[:2]
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        res = mp_face.process(rgb)
-        total_frames += 1
-
-        if res.multi_face_landmarks:
-            lm = res.multi_face_landmarks[0].landmark
-            face_present_count += 1
-            left_ear = eye_aspect_ratio(lm, LEFT_EYE_IDX, w, h)
-            right_ear = eye_aspect_ratio(lm, RIGHT_EYE_IDX, w, h)
-            if left_ear is not None and right_ear is not None:
-                ear = (left_ear + right_ear) / 2.0
-                ear_ema = ema(ear_ema, ear, config.get('ear_ema_alpha', 0.3))
-                if ear_ema < config['ear_blink_thresh'] and not blink_in_progress:
-                    blink_in_progress = True
-                if ear_ema >= config['ear_blink_thresh'] and blink_in_progress:
-                    blink_count += 1
-                    blink_in_progress = False
-            mar = mouth_aspect_ratio(lm, w, h)
-            if mar is not None:
-                mar_ema = ema(mar_ema, mar, config.get('mar_ema_alpha', 0.3))
-                if mar_ema > config['mar_yawn_thresh'] and not yawn_in_progress:
-                    yawn_in_progress = True
-                if mar_ema <= config['mar_yawn_thresh'] and yawn_in_progress:
-                    yawn_count += 1
-                    yawn_in_progress = False
-            g = compute_gaze_ratio(lm, w, h)
-            if g is not None:
-                if abs(g) < config['gaze_threshold']:
-                    gaze_on_count += 1
-            angles, label = head_pose(lm, w, h)
-            if label is not None:
-                if head_last_label is None:
-                    head_last_label = label
-                elif label != head_last_label:
-                    head_movement_count += 1
-                    head_last_label = label
-            # crop
-            xs = [int(p.x * w) for p in lm]
-            ys = [int(p.y * h) for p in lm]
-            xmin, xmax = max(min(xs) - 10, 0), min(max(xs) + 10, w)
-            ymin, ymax = max(min(ys) - 10, 0), min(max(ys) + 10, h)
-            if xmax > xmin and ymax > ymin:
-                area = (xmax - xmin) * (ymax - ymin)
-                candidate_faces.append((area, frame[ymin:ymax, xmin:xmax]))
-
-        # window end - YOUR DESIRED LOGIC IMPLEMENTED
-        if time.time() - window_start >= window_sec:
-            timestamp = int(time.time())
-            face_image_path = ''
-            emotion = 'detection_issues'
-            if face_present_count >= total_frames * 0.5 and len(candidate_faces) > 0:
-                best = sorted(candidate_faces, key=lambda x: x[0], reverse=True)[0]
-                img = best[1]
-                fname = f'{timestamp}.jpg'
-                fpath = IM_DIR / fname
-                cv2.imwrite(str(fpath), img)
-                face_image_path = str(fpath)
-                try:
-                    rgb_face = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                    df = DeepFace.analyze(rgb_face, actions=['emotion'], enforce_detection=False)
-                    if isinstance(df, list):
-                        df = df[0]
-                    emotion = df.get('dominant_emotion', 'unknown')
-                except Exception:
-                    emotion = 'unknown'
+    if from_video:
+        print('Processing', source)
+    else:
+        print("Starting capture. Press 'q' in the window to stop.")
+
+    draining = False
+    try:
+        while True:
+            timer.start()
+            if draining:
+                # the video has ended; finish the frames still in flight in the worker
+                if not worker.pending:
+                    break
+                process = True
+                frame, lm, t_ms = worker.collect(block=True)
+                timer.lap('facemesh')
             else:
+                ret, frame = cap.read(frame_bufs[slot])
+                if not ret:
+                    if from_video:
+                        if worker is not None and worker.pending:
+                            draining = True
+                            continue
+                        break
+                    time.sleep(0.01)
+                    continue
+                timer.lap('grab')
+                frame_bufs[slot] = frame
+                frame_idx += 1
+                if profiler is not None:
+                    profiler.on_frame(frame_idx)
+
+                # hot-swap the calibration profile when the kiosk user changes (one stat() per second)
+                if frame_idx % max(1, int(fps)) == 0:
+                    active = profiles.active_user()
+                    if active != last_active:
+                        last_active = active
+                        if active and active != user_id:
+                            user_id = active
+                            cfg = profiles.config_for(user_id)
+                            if autocal is not None:
+                                autocal = AutoCalibrator(cfg.get('auto_calib_interval', 30),
+                                                         cfg.get('auto_calib_max_step', 0.05))
+                            blinks = blink_detector(cfg)
+                            yawns = yawn_detector(cfg)
+                            print('Switched calibration profile:', user_id)
+
+                t_ms = clock() * 1000.0
+                timer.mark()
+                process = gate is None or gate.should_process(frame)
+                timer.lap('gate')
+                if not process:
+                    lm = None
+                elif worker is not None:
+                    worker.submit(frame, t_ms)
+                    # the submitted frame stays in use until collected; grab the next one into another buffer
+                    slot = (slot + 1) % len(frame_bufs)
+                    timer.lap('convert')
+                    item = worker.collect()
+                    timer.lap('facemesh')
+                    if item is None:
+                        # pipeline still filling
+                        continue
+                    # timestamps travel with the frame, so event durations ignore the pipeline delay
+                    frame, lm, t_ms = item
+                else:
+                    # convert into a reused buffer instead of allocating a new RGB frame each time
+                    if rgb is None or rgb.shape != frame.shape:
+                        rgb = np.empty_like(frame)
+                    cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+                    timer.lap('convert')
+                    res = mp_face.process(rgb)
+                    timer.lap('facemesh')
+                    lm = None
+                    if res.multi_face_landmarks:
+                        lm = lm_arr = landmarks_to_array(res.multi_face_landmarks[0].landmark, lm_arr)
+            h, w = frame.shape[:2]
+            if process and gate is not None:
+                gate.report(lm is not None)
+            win.total_frames += 1
+
+            if lm is not None:
+                win.face_present_count += 1
+                left_ear = eye_aspect_ratio(lm, LEFT_EYE_IDX, w, h)
+                right_ear = eye_aspect_ratio(lm, RIGHT_EYE_IDX, w, h)
+                ear = None
+                if left_ear is not None and right_ear is not None:
+                    ear = (left_ear + right_ear) / 2.0
+                    if blinks.update(ear, t_ms):
+                        win.blink_count += 1
+                mar = mouth_aspect_ratio(lm, w, h)
+                if mar is not None:
+                    if yawns.update(mar, t_ms):
+                        win.yawn_count += 1
+                if autocal is not None:
+                    autocal.add(ear, mar, cfg)
+                    for key, old, new in autocal.update(cfg, clock()):
+                        print('Auto-calibration: {} {:.3f} -> {:.3f}'.format(key, old, new))
+                    blinks.threshold = cfg['ear_blink_thresh']
+                    yawns.threshold = cfg['mar_yawn_thresh']
+                g = compute_gaze_ratio(lm, w, h)
+                if g is not None:
+                    if abs(g) < cfg['gaze_threshold']:
+                        win.gaze_on_count += 1
+                angles, label = head_pose(lm, w, h)
+                win.add_head_label(label)
+                # crop
+                box = face_bbox(lm, w, h)
+                if box is not None:
+                    xmin, ymin, xmax, ymax = box
+                    win.add_face((xmax - xmin) * (ymax - ymin), frame[ymin:ymax, xmin:xmax])
+            timer.lap('features')
+
+            # window end - YOUR DESIRED LOGIC IMPLEMENTED
+            now = clock()
+            if now - window_start >= window_sec:
+                timestamp = int(now)
                 face_image_path = ''
-                emotion = 'detection_issues'
-
-            # YOUR DESIRED CALCULATION METHOD - Count per second rates
-            blink_rate = round(blink_count / window_sec, 3)  # Blinks per second
-            yawn_rate = round(yawn_count / window_sec, 3)  # Yawns per second
-            head_movement_rate = round(head_movement_count / window_sec, 3)  # Movements per second
-            gaze_ratio = round(gaze_on_count / max(1, total_frames), 3)  # Gaze ratio (0-1)
-
-            final_head_pose = head_last_label if head_last_label else 'unknown'
-
-            # Store the per-second rates
-            row = [timestamp, face_image_path, emotion, blink_rate, yawn_rate,
-                   gaze_ratio, final_head_pose, head_movement_rate]
-
-            with open(CSV_PATH, 'a', newline='') as f:
-                import csv as _csv
-                writer = _csv.writer(f)
-                writer.writerow(row)
-
-            # reset window
-            window_start = time.time()
-            blink_count = 0
-            blink_in_progress = False
-            yawn_count = 0
-            yawn_in_progress = False
-            gaze_on_count = 0
-            face_present_count = 0
-            total_frames = 0
-            candidate_faces = []
-            head_last_label = None
-            head_movement_count = 0
-
-        cv2.imshow('Capture (press q to quit)', frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
+                emotion_label = 'not_detected'
+                if win.face_detected():
+                    img = win.best_face()
+                    # None while the model is still loading in the background
+                    emotion_label = emotion.analyze(img) or 'unknown'
+                    timer.lap('emotion')
+
+                # YOUR DESIRED CALCULATION METHOD - Count per second rates
+                blink_rate, yawn_rate, gaze_ratio, final_head_pose, head_movement_rate = win.rates()
+
+                if win.face_detected() and keep_snapshot(cfg.get('snapshot_keep', 'all'), emotion_label, gaze_ratio):
+                    face_image_path = snapshots.submit(timestamp, win.best_face())
+                    timer.lap('snapshot')
+
+                # Store the per-second rates, with labels in the shared schema's vocabulary
+                row = [timestamp, face_image_path, canonical_emotion(emotion_label), blink_rate, yawn_rate,
+                       gaze_ratio, canonical_head_pose(final_head_pose), head_movement_rate, user_id or '']
+
+                with open(CSV_PATH, 'a', newline='') as f:
+                    import csv as _csv
+                    writer = _csv.writer(f)
+                    writer.writerow(row)
+                timer.lap('csv')
+
+                # reset window
+                # an event still in progress is counted in the window where it ends
+                window_start = now
+                win.reset()
+
+            if not headless:
+                timer.overlay(frame)
+                cv2.imshow('Capture (press q to quit)', frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                timer.lap('imshow')
+            if metrics_writer is not None:
+                metrics_writer.maybe_write()
+    finally:
+        cap.release()
+        snapshots.close()
+        if gate is not None and gate.skipped:
+            print('Presence gate skipped FaceMesh on {} of {} frames'.format(gate.skipped, frame_idx))
+        if worker is not None:
+            worker.close()
+        if not headless:
+            cv2.destroyAllWindows()
+        if profiler is not None:
+            profiler.close(frame_idx)
+        if metrics_writer is not None:
+            metrics_writer.write()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--user', type=str, default=None, help='Calibration profile to start with')
+    parser.add_argument('--profiles', type=str, default=str(PROFILE_DIR), help='Profile directory')
+    parser.add_argument('--metrics', action='store_true', help='Record per-stage timings and show FPS on the preview')
+    parser.add_argument('--video', type=str, default=None, help='Process a recorded video instead of the camera')
+    parser.add_argument('--headless', action='store_true', help='Run without a preview window')
+    parser.add_argument('--facemesh-worker', action='store_true',
+                        help='Run FaceMesh in a separate process fed through shared memory')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help='Profile a span of frames with cProfile or the sampling profiler')
+    parser.add_argument('--profile-start', type=int, default=100, help='First frame to profile')
+    parser.add_argument('--profile-frames', type=int, default=300, help='Number of frames to profile')
+    parser.add_argument('--profile-top', type=int, default=30, help='Functions listed in the summary')
+    args = parser.parse_args()
+    profiler = None
+    if args.profile:
+        profiler = SessionProfiler(args.profile, args.profile_start, args.profile_frames, OUT_DIR, args.profile_top)
+    main(args.user, args.profiles, instrument=args.metrics or None, source=args.video if args.video else 0,
+         headless=args.headless, profiler=profiler, facemesh_worker=args.facemesh_worker or None)
\ No newline at end of file
@@ -1,15 +1,42 @@
 # config.py
 import json
 
+from schema import WINDOW_SEC
+
 DEFAULTS = {
-    "window_sec": 10,
+    "window_sec": WINDOW_SEC,
     "calibration_duration": 30,
     "ear_blink_thresh": 0.23,  # reasonable default; calibration will adapt
-    "ear_ema_alpha": 0.3,
+    "ear_ema_tau_ms": 60,      # EAR smoothing time constant (frame-rate independent)
+    "blink_hysteresis": 0.1,   # a blink ends once EAR is 10% above the threshold
+    "blink_min_ms": 80,        # shorter dips are landmark jitter
+    "blink_max_ms": 600,       # longer closures are not counted as blinks
     "mar_yawn_thresh": 0.6,    # typical MAR threshold used in many tutorials
-    "mar_ema_alpha": 0.3,
+    "mar_ema_tau_ms": 150,     # MAR smoothing time constant
+    "yawn_hysteresis": 0.1,    # a yawn ends once MAR is 10% below the threshold
+    "yawn_min_ms": 800,        # shorter openings are speech
+    "yawn_max_ms": 8000,
     "gaze_threshold": 0.35,    # normalized pupil offset below which gaze is on-screen
     "min_frames_required": 3,  # min frames to consider detection valid
+    "auto_calibrate": True,    # keep adapting blink/yawn thresholds during capture
+    "auto_calib_interval": 30, # seconds of samples per threshold update
+    "auto_calib_max_step": 0.05,  # max relative threshold change per update
+    "instrument": False,       # per-stage timings, FPS overlay and output/metrics.*
+    "metrics_interval": 10,    # seconds between metrics.log lines / metrics.prom rewrites
+    "facemesh_worker": False,  # run FaceMesh in a child process fed through shared memory
+    "ring_slots": 4,           # frames in the shared-memory ring
+    "presence_gate": True,     # skip FaceMesh while the scene is dark or empty
+    "presence_min_brightness": 20,  # mean gray level below which a frame counts as dark
+    "presence_motion": 6.0,    # thumbnail change that wakes FaceMesh up while nobody is there
+    "presence_probe_every": 15,  # frames between FaceMesh probes while nobody is there
+    "presence_absent_after": 15, # frames without a face before the gate kicks in
+    "snapshot_quality": 90,    # JPEG quality of the per-window face crops
+    "snapshot_max_side": 0,    # downscale crops to this many pixels on the long side (0 = keep)
+    "snapshot_keep": "all",    # all | flagged (off-screen gaze / unknown emotion) | none
+    "snapshot_max_count": 0,   # delete the oldest files beyond this many (0 = no limit)
+    "snapshot_max_mb": 0,      # delete the oldest files beyond this many MB (0 = no limit)
+    "snapshot_archive": False, # pack crops into append-only faces_*.pack segments
+    "snapshot_segment_mb": 64, # size of each archive segment
 }
 
 def save_config(path, data):
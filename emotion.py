@@ -0,0 +1,78 @@
+# emotion.py
+import os
+import threading
+import time
+import cv2
+
+# DeepFace pulls in tensorflow, which takes seconds to import. It is loaded on a
+# background thread so capture can start reading frames immediately; until the
+# model is ready analyze() returns None.
+
+_deepface = None
+_ready = threading.Event()
+_started = threading.Lock()
+_thread = None
+import_times = {}
+
+
+def _load():
+    global _deepface
+    try:
+        os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '0')
+        t0 = time.perf_counter()
+        import tensorflow  # noqa: F401
+        import_times['tensorflow'] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        from deepface import DeepFace
+        import_times['deepface'] = time.perf_counter() - t0
+
+        # build the emotion model now so the first analyze() call does not pay for it
+        t0 = time.perf_counter()
+        try:
+            DeepFace.build_model(model_name='Emotion', task='facial_attribute')
+        except TypeError:
+            DeepFace.build_model('Emotion')
+        import_times['emotion_model'] = time.perf_counter() - t0
+
+        _deepface = DeepFace
+        print('Emotion model ready ({})'.format(
+            ', '.join('{} {:.2f}s'.format(k, v) for k, v in import_times.items())))
+    except Exception as e:
+        print('Emotion model unavailable:', e)
+    finally:
+        _ready.set()
+
+
+def warm_up():
+    """Start loading DeepFace in the background (idempotent)."""
+    global _thread
+    with _started:
+        if _thread is None:
+            _thread = threading.Thread(target=_load, name='emotion-warmup', daemon=True)
+            _thread.start()
+
+
+def is_ready():
+    return _deepface is not None
+
+
+def wait(timeout=None):
+    warm_up()
+    _ready.wait(timeout)
+    return is_ready()
+
+
+def analyze(face_bgr):
+    """Dominant emotion for a BGR face crop, 'unknown' on failure, or None while the model is loading."""
+    if _deepface is None:
+        warm_up()
+        return None
+    try:
+        rgb_face = cv2.cvtColor(face_bgr, cv2.COLOR_BGR2RGB)
+        df = _deepface.analyze(rgb_face, actions=['emotion'], enforce_detection=False)
+        if isinstance(df, list):
+            df = df[0]
+        return df.get('dominant_emotion', 'unknown')
+    except Exception:
+        return 'unknown'
@@ -0,0 +1,100 @@
+# events.py
+import math
+
+
+class TimeEMA:
+    """
+    Exponential moving average over irregularly spaced samples. The weight of a
+    new sample is 1 - exp(-dt / tau), so the smoothing time constant is the
+    same at 15 FPS and at 60 FPS, and after a gap the average catches up at once.
+    Samples at least `tau_ms` apart are not smoothed at all: there is no jitter
+    between them left to average, only the dip of a short event to flatten.
+    """
+
+    def __init__(self, tau_ms):
+        self.tau_ms = tau_ms
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.t_ms = None
+
+    def update(self, value, t_ms):
+        if self.value is None or self.tau_ms <= 0:
+            self.value = value
+        else:
+            dt = max(0.0, t_ms - self.t_ms)
+            alpha = 1.0 if dt >= self.tau_ms else 1.0 - math.exp(-dt / self.tau_ms)
+            self.value += alpha * (value - self.value)
+        self.t_ms = t_ms
+        return self.value
+
+
+class EventDetector:
+    """
+    Counts short excursions of a signal past a threshold: blinks (EAR below the
+    threshold) or yawns (MAR above it). An event starts when the smoothed value
+    crosses `threshold` and ends only once it is back past the threshold by a
+    relative `hysteresis` margin, so jitter around the threshold is not counted
+    twice. It counts only if it lasted between `min_ms` and `max_ms`; longer
+    excursions (eyes closed, talking) are dropped. Both crossings happen somewhere
+    within a frame interval, so the sampled duration is only known to +-one
+    interval; an event counts if that range reaches the limits, which keeps a
+    one-frame 100 ms blink at 15 FPS from being measured as 67 ms and dropped.
+
+    `threshold` may be changed at any time, e.g. by AutoCalibrator.
+    """
+
+    def __init__(self, threshold, below=True, hysteresis=0.1, tau_ms=0, min_ms=0, max_ms=None):
+        self.threshold = threshold
+        self.below = below
+        self.hysteresis = hysteresis
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.ema = TimeEMA(tau_ms)
+        self.start_ms = None
+
+    @property
+    def active(self):
+        return self.start_ms is not None
+
+    def reset(self):
+        self.ema.reset()
+        self.start_ms = None
+
+    def _entered(self, v):
+        return v < self.threshold if self.below else v > self.threshold
+
+    def _left(self, v):
+        if self.below:
+            return v >= self.threshold * (1 + self.hysteresis)
+        return v <= self.threshold * (1 - self.hysteresis)
+
+    def update(self, value, t_ms):
+        """Feed one sample at time `t_ms`; True when an event of valid duration has just ended."""
+        dt = 0.0 if self.ema.t_ms is None else max(0.0, t_ms - self.ema.t_ms)
+        v = self.ema.update(value, t_ms)
+        if self.start_ms is None:
+            if self._entered(v):
+                self.start_ms = t_ms
+            return False
+        if not self._left(v):
+            return False
+        duration = t_ms - self.start_ms
+        self.start_ms = None
+        if self.max_ms is not None and duration - dt > self.max_ms:
+            # too long to be a blink/yawn (eyes closed, talking)
+            return False
+        return duration + dt >= self.min_ms
+
+
+def blink_detector(cfg):
+    return EventDetector(cfg['ear_blink_thresh'], below=True, hysteresis=cfg.get('blink_hysteresis', 0.1),
+                         tau_ms=cfg.get('ear_ema_tau_ms', 60), min_ms=cfg.get('blink_min_ms', 80),
+                         max_ms=cfg.get('blink_max_ms', 600))
+
+
+def yawn_detector(cfg):
+    return EventDetector(cfg['mar_yawn_thresh'], below=False, hysteresis=cfg.get('yawn_hysteresis', 0.1),
+                         tau_ms=cfg.get('mar_ema_tau_ms', 150), min_ms=cfg.get('yawn_min_ms', 800),
+                         max_ms=cfg.get('yawn_max_ms', 8000))
@@ -0,0 +1,173 @@
+# frame_ring.py
+import multiprocessing as mp
+import queue
+import sys
+from collections import deque
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+
+
+class FrameRing:
+    """
+    Ring of equally shaped frames in shared memory. Processes exchange only slot
+    indices through queues: the producer acquire()s a free slot, fills
+    view(slot) in place and publish()es it; a consumer gets a zero-copy view from
+    consume() and release()s the slot when it is done with it.
+    The ring can be passed to a child process as a Process argument.
+    """
+
+    def __init__(self, slots, shape, dtype=np.uint8, ctx=None):
+        ctx = ctx or mp.get_context('spawn')
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize * slots
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._owner = True
+        self._free = ctx.Queue()
+        self._ready = ctx.Queue()
+        for i in range(slots):
+            self._free.put(i)
+        self._views = self._make_views()
+
+    def _make_views(self):
+        buf = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=self._shm.buf)
+        return [buf[i] for i in range(self.slots)]
+
+    def __getstate__(self):
+        return {'slots': self.slots, 'shape': self.shape, 'dtype': self.dtype.str, 'name': self._shm.name,
+                'free': self._free, 'ready': self._ready}
+
+    def __setstate__(self, state):
+        self.slots = state['slots']
+        self.shape = state['shape']
+        self.dtype = np.dtype(state['dtype'])
+        self._free = state['free']
+        self._ready = state['ready']
+        if sys.version_info >= (3, 13):
+            self._shm = shared_memory.SharedMemory(name=state['name'], track=False)
+        else:
+            self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._views = self._make_views()
+
+    def view(self, idx):
+        return self._views[idx]
+
+    def acquire(self, timeout=None):
+        """Index of a free slot; blocks while every slot is in use. None on timeout."""
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def publish(self, idx, meta=None):
+        self._ready.put((idx, meta))
+
+    def consume(self, timeout=None):
+        """(idx, view, meta) for the next published slot, or None on stop()/timeout."""
+        try:
+            item = self._ready.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if item is None:
+            return None
+        idx, meta = item
+        return idx, self._views[idx], meta
+
+    def release(self, idx):
+        self._free.put(idx)
+
+    def stop(self, consumers=1):
+        for _ in range(consumers):
+            self._ready.put(None)
+
+    def close(self):
+        self._views = []
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def facemesh_worker(ring, results):
+    """Child process: FaceMesh on ring slots, sends (meta, landmarks or None) back; landmarks are (478, 3) normalized."""
+    import mediapipe as mp_solutions
+    face_mesh = mp_solutions.solutions.face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True)
+    try:
+        while True:
+            item = ring.consume()
+            if item is None:
+                break
+            idx, rgb, meta = item
+            res = face_mesh.process(rgb)
+            ring.release(idx)
+            lm = None
+            if res.multi_face_landmarks:
+                lm = np.array([(p.x, p.y, p.z) for p in res.multi_face_landmarks[0].landmark], dtype=np.float32)
+            results.put((meta, lm))
+    finally:
+        face_mesh.close()
+        ring.close()
+
+
+class FaceMeshWorker:
+    """
+    Runs FaceMesh in a separate process fed through a FrameRing. submit() converts
+    the BGR frame straight into a ring slot; collect() returns (frame, landmarks,
+    meta) in submission order once `depth` frames are in flight, so grabbing and feature
+    extraction overlap with landmark detection. Both wait in steps of `poll`
+    seconds and raise RuntimeError if the worker process has died meanwhile.
+    """
+
+    def __init__(self, slots=4, depth=2, poll=1.0):
+        self.slots = slots
+        self.depth = depth
+        self.poll = poll
+        self.ring = None
+        self.proc = None
+        self.pending = deque()
+        self._ctx = mp.get_context('spawn')
+        self._results = self._ctx.Queue()
+
+    def _start(self, shape):
+        self.ring = FrameRing(self.slots, shape, np.uint8, ctx=self._ctx)
+        self.proc = self._ctx.Process(target=facemesh_worker, args=(self.ring, self._results),
+                                      name='facemesh-worker', daemon=True)
+        self.proc.start()
+
+    def _check_alive(self):
+        if not self.proc.is_alive():
+            raise RuntimeError('FaceMesh worker exited with code {}'.format(self.proc.exitcode))
+
+    def submit(self, frame, meta=None):
+        if self.ring is None:
+            self._start(frame.shape)
+        idx = self.ring.acquire(timeout=self.poll)
+        while idx is None:
+            self._check_alive()
+            idx = self.ring.acquire(timeout=self.poll)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.ring.view(idx))
+        self.ring.publish(idx, meta)
+        self.pending.append(frame)
+
+    def collect(self, block=False):
+        """(frame, landmarks, meta) for the oldest submitted frame, or None if it should not be waited for yet."""
+        if not self.pending or (len(self.pending) < self.depth and not block):
+            return None
+        while True:
+            try:
+                meta, lm = self._results.get(timeout=self.poll)
+                break
+            except queue.Empty:
+                self._check_alive()
+        return self.pending.popleft(), lm, meta
+
+    def close(self):
+        if self.proc is not None:
+            self.ring.stop()
+            self.proc.join(timeout=5)
+            if self.proc.is_alive():
+                self.proc.terminate()
+            self.ring.close()
+            self.proc = None
@@ -0,0 +1,140 @@
+# metrics.py
+import bisect
+import os
+import time
+import cv2
+
+# histogram bucket upper bounds in milliseconds (last bucket catches everything)
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, float('inf'))
+
+CAPTURE_STAGES = ('grab', 'gate', 'convert', 'facemesh', 'features', 'snapshot', 'emotion', 'csv', 'imshow')
+
+
+class StageTimer:
+    """
+    Per-stage latency histograms for the capture loop. Call start() at the top of
+    each frame and lap(stage) after each stage; a lap records the time since the
+    previous start/lap/mark.
+    """
+
+    def __init__(self, stages=CAPTURE_STAGES, alpha=0.1):
+        self.stages = tuple(stages)
+        self.alpha = alpha
+        self.hist = {s: [0] * len(BUCKETS_MS) for s in self.stages}
+        self.sum_ms = dict.fromkeys(self.stages, 0.0)
+        self.count = dict.fromkeys(self.stages, 0)
+        self.recent_ms = dict.fromkeys(self.stages, 0.0)
+        self.frames = 0
+        self.fps = 0.0
+        self._t = time.perf_counter()
+        self._frame_t = None
+
+    def start(self):
+        now = time.perf_counter()
+        if self._frame_t is not None:
+            dt = now - self._frame_t
+            if dt > 0:
+                self.fps = 1.0 / dt if self.fps == 0 else self.alpha / dt + (1 - self.alpha) * self.fps
+        self._frame_t = now
+        self._t = now
+        self.frames += 1
+
+    def mark(self):
+        """Reset the lap clock without recording anything."""
+        self._t = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        ms = (now - self._t) * 1000.0
+        self._t = now
+        self.hist[stage][bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.sum_ms[stage] += ms
+        self.count[stage] += 1
+        self.recent_ms[stage] = self.alpha * ms + (1 - self.alpha) * self.recent_ms[stage]
+
+    def percentile(self, stage, q):
+        """Bucket upper bound (ms) containing the q-th quantile."""
+        total = self.count[stage]
+        if total == 0:
+            return None
+        target = q * total
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.hist[stage]):
+            seen += n
+            if seen >= target:
+                return bound
+        return BUCKETS_MS[-1]
+
+    def overlay(self, frame):
+        y = 20
+        cv2.putText(frame, 'FPS {:.1f}'.format(self.fps), (frame.shape[1] - 170, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+        for stage in self.stages:
+            if self.count[stage] == 0:
+                continue
+            y += 16
+            cv2.putText(frame, '{:<9}{:6.1f}ms'.format(stage, self.recent_ms[stage]),
+                        (frame.shape[1] - 170, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 255), 1)
+
+    def summary_line(self):
+        parts = ['ts={}'.format(int(time.time())), 'fps={:.1f}'.format(self.fps)]
+        for stage in self.stages:
+            n = self.count[stage]
+            if n:
+                parts.append('{}={:.2f}/{}ms'.format(stage, self.sum_ms[stage] / n, self.percentile(stage, 0.95)))
+        return ' '.join(parts)
+
+    def prometheus(self):
+        lines = ['# TYPE capture_fps gauge', 'capture_fps {:.3f}'.format(self.fps),
+                 '# TYPE capture_stage_seconds histogram']
+        for stage in self.stages:
+            cumulative = 0
+            for bound, n in zip(BUCKETS_MS, self.hist[stage]):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound / 1000.0)
+                lines.append('capture_stage_seconds_bucket{{stage="{}",le="{}"}} {}'.format(stage, le, cumulative))
+            lines.append('capture_stage_seconds_sum{{stage="{}"}} {:.6f}'.format(stage, self.sum_ms[stage] / 1000.0))
+            lines.append('capture_stage_seconds_count{{stage="{}"}} {}'.format(stage, self.count[stage]))
+        return '\n'.join(lines) + '\n'
+
+
+class NullTimer:
+    """Drop-in for StageTimer when instrumentation is off; every call is a no-op."""
+
+    def start(self):
+        pass
+
+    def mark(self):
+        pass
+
+    def lap(self, stage):
+        pass
+
+    def overlay(self, frame):
+        pass
+
+
+class MetricsWriter:
+    """Appends a summary line to `log_path` and rewrites the Prometheus text file every `interval` seconds."""
+
+    def __init__(self, timer, log_path, prom_path, interval=10):
+        self.timer = timer
+        self.log_path = log_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self._next = time.time() + interval
+
+    def maybe_write(self, now=None):
+        now = now or time.time()
+        if now < self._next:
+            return
+        self._next = now + self.interval
+        self.write()
+
+    def write(self):
+        with open(self.log_path, 'a') as f:
+            f.write(self.timer.summary_line() + '\n')
+        tmp = str(self.prom_path) + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.timer.prometheus())
+        os.replace(tmp, self.prom_path)
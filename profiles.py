@@ -0,0 +1,128 @@
+# profiles.py
+import argparse
+import json
+import os
+import re
+import time
+from pathlib import Path
+from config import DEFAULTS, save_config, load_config
+
+PROFILE_DIR = Path('profiles')
+ACTIVE_FILE = 'active'
+THRESHOLD_KEYS = ('ear_blink_thresh', 'mar_yawn_thresh', 'gaze_threshold')
+
+_USER_ID_RE = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def _check_user_id(user_id):
+    if not user_id or not _USER_ID_RE.match(user_id) or user_id.startswith('.'):
+        raise ValueError('invalid user id: {!r}'.format(user_id))
+    return user_id
+
+
+class ProfileStore:
+    """
+    Calibration profiles keyed by user ID, stored as profiles/<user_id>.json.
+    Profiles are read on first use and cached; a cached profile is re-read only
+    when its file changes. The kiosk's current user is kept in profiles/active so
+    a running capture can switch users without restarting.
+    """
+
+    def __init__(self, root=PROFILE_DIR, base_config=None):
+        self.root = Path(root)
+        self.base_config = base_config if base_config is not None else DEFAULTS
+        self._cache = {}
+        self._active = (None, None)
+
+    def path(self, user_id):
+        return self.root / '{}.json'.format(_check_user_id(user_id))
+
+    def users(self):
+        if not self.root.exists():
+            return []
+        return sorted(p.stem for p in self.root.glob('*.json'))
+
+    def get(self, user_id):
+        """Return the stored profile dict, or None if the user has not been calibrated."""
+        path = self.path(user_id)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._cache.pop(user_id, None)
+            return None
+        cached = self._cache.get(user_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        profile = load_config(str(path))
+        self._cache[user_id] = (mtime, profile)
+        return profile
+
+    def config_for(self, user_id):
+        """Base config with the user's calibrated thresholds applied."""
+        cfg = dict(self.base_config)
+        profile = self.get(user_id) if user_id else None
+        if profile:
+            cfg.update(profile.get('thresholds', {}))
+        return cfg
+
+    def save(self, user_id, thresholds, stats):
+        profile = {
+            'user_id': user_id,
+            'updated': int(time.time()),
+            'thresholds': {k: thresholds[k] for k in THRESHOLD_KEYS},
+            'stats': stats,
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path(user_id)
+        tmp = path.with_suffix('.tmp')
+        save_config(str(tmp), profile)
+        os.replace(tmp, path)
+        self._cache.pop(user_id, None)
+        return profile
+
+    def set_active(self, user_id):
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / ACTIVE_FILE
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            f.write(_check_user_id(user_id) if user_id else '')
+        os.replace(tmp, path)
+
+    def active_user(self):
+        """Current kiosk user, or None. Costs a single stat() unless the active file changed."""
+        path = self.root / ACTIVE_FILE
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._active = (None, None)
+            return None
+        if self._active[0] != mtime:
+            with open(path) as f:
+                user_id = f.read().strip() or None
+            self._active = (mtime, user_id)
+        return self._active[1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage per-user calibration profiles')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('list', help='List calibrated users')
+    show = sub.add_parser('show', help='Print a user profile')
+    show.add_argument('user')
+    use = sub.add_parser('use', help='Switch the running capture to this user')
+    use.add_argument('user')
+    parser.add_argument('--dir', type=str, default=str(PROFILE_DIR), help='Profile directory')
+    args = parser.parse_args()
+
+    store = ProfileStore(args.dir)
+    if args.cmd == 'list':
+        active = store.active_user()
+        for user in store.users():
+            print(('* ' if user == active else '  ') + user)
+    elif args.cmd == 'show':
+        print(json.dumps(store.get(args.user), indent=2))
+    elif args.cmd == 'use':
+        if store.get(args.user) is None:
+            print('Warning: no calibration profile for {}, defaults will be used'.format(args.user))
+        store.set_active(args.user)
+        print('Active profile:', args.user)
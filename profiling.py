@@ -0,0 +1,141 @@
+# profiling.py
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler: a background thread snapshots the target
+    thread's Python stack every `interval` seconds. Nothing is hooked into the
+    profiled code, so overhead stays roughly constant regardless of call volume.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{}:{}:{}'.format(Path(code.co_filename).name, code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def enable(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def dump_folded(self, path):
+        """Collapsed stacks, one per line, as consumed by flamegraph.pl / speedscope."""
+        with open(path, 'w') as f:
+            for stack, n in self.stacks.most_common():
+                f.write('{} {}\n'.format(stack, n))
+
+    def summary(self, top_n=30):
+        own = Counter()
+        inclusive = Counter()
+        for stack, n in self.stacks.items():
+            funcs = stack.split(';')
+            own[funcs[-1]] += n
+            for func in set(funcs):
+                inclusive[func] += n
+        total = max(1, self.samples)
+        lines = ['{} samples every {:.1f}ms'.format(self.samples, self.interval * 1000), '',
+                 'Top {} by own time:'.format(top_n)]
+        lines += ['{:6.1f}%  {}'.format(100.0 * n / total, func) for func, n in own.most_common(top_n)]
+        lines += ['', 'Top {} by inclusive time:'.format(top_n)]
+        lines += ['{:6.1f}%  {}'.format(100.0 * n / total, func) for func, n in inclusive.most_common(top_n)]
+        return '\n'.join(lines) + '\n'
+
+
+class SessionProfiler:
+    """
+    Profiles frames [start_frame, start_frame + n_frames) of a capture session
+    and writes the profile plus a top-N hot-function summary to `out_dir`.
+    """
+
+    def __init__(self, mode='cprofile', start_frame=100, n_frames=300, out_dir='output', top_n=30,
+                 interval=0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError('profile mode must be one of {}'.format(PROFILE_MODES))
+        self.mode = mode
+        self.start_frame = start_frame
+        self.end_frame = start_frame + n_frames
+        self.out_dir = Path(out_dir)
+        self.top_n = top_n
+        self.interval = interval
+        self._profiler = None
+        self._t0 = None
+        self.done = False
+
+    def on_frame(self, frame_idx):
+        if self.done:
+            return
+        if self._profiler is None and frame_idx >= self.start_frame:
+            self._start(frame_idx)
+        elif self._profiler is not None and frame_idx >= self.end_frame:
+            self._finish(frame_idx)
+
+    def close(self, frame_idx=None):
+        """Write out a profile that is still running when the session ends."""
+        if self._profiler is not None:
+            self._finish(frame_idx)
+
+    def _start(self, frame_idx):
+        print('Profiling ({}) from frame {}'.format(self.mode, frame_idx))
+        self._profiler = cProfile.Profile() if self.mode == 'cprofile' else SamplingProfiler(self.interval)
+        self._first = frame_idx
+        self._t0 = time.perf_counter()
+        self._profiler.enable()
+
+    def _finish(self, frame_idx):
+        self._profiler.disable()
+        elapsed = time.perf_counter() - self._t0
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = '{}_{}'.format(time.strftime('%Y%m%d-%H%M%S'), self.mode)
+        header = 'frames {}-{} ({:.1f}s, mode={})\n\n'.format(self._first, frame_idx, elapsed, self.mode)
+
+        if self.mode == 'cprofile':
+            prof_path = self.out_dir / 'profile_{}.prof'.format(stamp)
+            self._profiler.dump_stats(str(prof_path))
+            buf = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=buf).strip_dirs()
+            stats.sort_stats('tottime').print_stats(self.top_n)
+            stats.sort_stats('cumulative').print_stats(self.top_n)
+            summary = buf.getvalue()
+        else:
+            prof_path = self.out_dir / 'profile_{}.folded'.format(stamp)
+            self._profiler.dump_folded(prof_path)
+            summary = self._profiler.summary(self.top_n)
+
+        summary_path = self.out_dir / 'profile_{}_top.txt'.format(stamp)
+        with open(summary_path, 'w') as f:
+            f.write(header + summary)
+        print('Profile written to {} (summary: {})'.format(prof_path, summary_path))
+        self._profiler = None
+        self.done = True
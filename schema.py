@@ -0,0 +1,95 @@
+# schema.py
+"""
+Window record schema shared by capture (output/data.csv), the training data
+(Tabular Model/fyp_dataset.csv) and the app.
+
+Categorical values are stored as small-int codes into the tuples below, so
+converting a whole column is one lookup-table index instead of per-row dict or
+DataFrame work. Labels from other sources are mapped through the *_ALIASES
+tables (utils.head_pose and older capture output say 'frontal' and
+'detection_issues' where the dataset says 'center' and 'not_detected').
+"""
+import numpy as np
+
+WINDOW_SEC = 10  # seconds per window; capture rates are events / WINDOW_SEC
+
+# capture output, one row per window
+WINDOW_COLUMNS = ['timestamp', 'face_image', 'emotion', 'blink_rate', 'yawn_rate', 'gaze_ratio', 'head_pose',
+                  'head_movement_rate', 'user_id']
+
+EMOTIONS = ('happy', 'neutral', 'sad', 'tired', 'angry', 'disgust', 'fear', 'surprise', 'unknown', 'not_detected')
+EMOTION_ALIASES = {'detection_issues': 'not_detected'}
+HEAD_POSES = ('center', 'down', 'left', 'right', 'up', 'unknown')
+HEAD_POSE_ALIASES = {'frontal': 'center'}
+STATUSES = ('bore', 'engaged')
+
+# model input layout; names (and the dataset's units) are what the scaler was fitted on
+emotion_map = {"happy": 0, "neutral": 1, "sad": 2, "tired": 3}
+pose_cols = ["pose_center", "pose_down", "pose_left", "pose_right", "pose_up"]
+feature_order = [
+    "blink_rate", "yawn_count", "gaze_on_screen", "head_movement",
+    "emotion_encoded", "pose_center", "pose_down", "pose_left",
+    "pose_right", "pose_up"
+]
+status_map = {s: i for i, s in enumerate(STATUSES)}
+
+# emotion code -> model emotion_encoded; anything the model was not trained on counts as neutral
+_MODEL_EMOTION = np.array([emotion_map.get(e, emotion_map["neutral"]) for e in EMOTIONS], dtype=np.float64)
+# head pose code -> one-hot over pose_cols; 'unknown' is all zeros
+_POSE_ONEHOT = np.vstack([np.eye(len(pose_cols)), np.zeros((1, len(pose_cols)))])
+
+
+def _codes(values, vocab, aliases, default):
+    lookup = {label: i for i, label in enumerate(vocab)}
+    values = np.asarray(values, dtype=object)
+    # labels repeat heavily, so only the distinct ones go through Python
+    uniq, inverse = np.unique(values.astype(str), return_inverse=True)
+    table = np.empty(len(uniq), dtype=np.int8)
+    for i, label in enumerate(uniq):
+        label = label.strip().lower()
+        table[i] = lookup.get(aliases.get(label, label), default)
+    return table[inverse.reshape(-1)]
+
+
+def emotion_codes(values):
+    """int8 codes into EMOTIONS; unrecognised labels become 'unknown'."""
+    return _codes(values, EMOTIONS, EMOTION_ALIASES, EMOTIONS.index('unknown'))
+
+
+def head_pose_codes(values):
+    """int8 codes into HEAD_POSES; unrecognised labels become 'unknown'."""
+    return _codes(values, HEAD_POSES, HEAD_POSE_ALIASES, HEAD_POSES.index('unknown'))
+
+
+def canonical_emotion(label):
+    return EMOTIONS[emotion_codes([label])[0]]
+
+
+def canonical_head_pose(label):
+    return HEAD_POSES[head_pose_codes([label])[0]]
+
+
+def model_matrix(blink_rate, yawn_rate, gaze_pct, head_movement_rate, emotion, head_pose):
+    """
+    (n, 10) float64 model input in feature_order. Rates are per second, gaze is
+    the percentage of frames on screen, and emotion / head_pose are codes from
+    emotion_codes() / head_pose_codes().
+    """
+    emotion = np.asarray(emotion)
+    X = np.empty((len(emotion), len(feature_order)), dtype=np.float64)
+    X[:, 0] = blink_rate
+    X[:, 1] = yawn_rate
+    X[:, 2] = gaze_pct
+    X[:, 3] = head_movement_rate
+    X[:, 4] = _MODEL_EMOTION[emotion]
+    X[:, 5:] = _POSE_ONEHOT[np.asarray(head_pose)]
+    return X
+
+
+def capture_matrix(columns):
+    """model_matrix() for capture windows given as a mapping of WINDOW_COLUMNS to arrays (e.g. a DataFrame)."""
+    return model_matrix(np.asarray(columns['blink_rate'], dtype=np.float64),
+                        np.asarray(columns['yawn_rate'], dtype=np.float64),
+                        np.asarray(columns['gaze_ratio'], dtype=np.float64) * 100.0,
+                        np.asarray(columns['head_movement_rate'], dtype=np.float64),
+                        emotion_codes(columns['emotion']), head_pose_codes(columns['head_pose']))
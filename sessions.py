@@ -0,0 +1,264 @@
+# sessions.py
+"""
+Indexed store of capture windows for time-range analytics.
+
+    python sessions.py ingest                       # append new rows of output/data.csv
+    python sessions.py score                        # label unscored windows with the model
+    python sessions.py summary --user alice --start 2024-05-01T10:00 --end 2024-05-01T11:00
+
+Windows live in SQLite keyed by (user_id, timestamp), with a second index on
+timestamp for queries across users. Per-hour sums (split by emotion) are kept
+in a rollup table, so a query reads the rollup for the whole hours in its
+range and raw windows only for the partial hours at either end. Categorical
+columns are stored as schema codes.
+"""
+import argparse
+import csv
+import sqlite3
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from schema import EMOTIONS, STATUSES, feature_order, emotion_codes, head_pose_codes, model_matrix
+
+DB_PATH = Path('output') / 'sessions.db'
+CSV_PATH = Path('output') / 'data.csv'
+MODEL_PATH = Path('Tabular Model') / 'svm_with_scaler.pkl'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS windows (
+    user_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    face_image TEXT,
+    emotion INTEGER NOT NULL,
+    blink_rate REAL,
+    yawn_rate REAL,
+    gaze_ratio REAL,
+    head_pose INTEGER NOT NULL,
+    head_movement_rate REAL,
+    status INTEGER,
+    PRIMARY KEY (user_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS windows_ts ON windows (ts);
+CREATE INDEX IF NOT EXISTS windows_unscored ON windows (ts) WHERE status IS NULL;
+CREATE TABLE IF NOT EXISTS hourly (
+    user_id TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    emotion INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    scored INTEGER NOT NULL,
+    bore INTEGER NOT NULL,
+    blink_rate REAL,
+    yawn_rate REAL,
+    gaze_ratio REAL,
+    head_movement_rate REAL,
+    PRIMARY KEY (user_id, hour, emotion)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hourly_hour ON hourly (hour);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+"""
+
+HOUR = 3600
+# per-emotion sums, from raw windows or the hourly rollup
+_RAW_SUMS = ('emotion, COUNT(*), COUNT(status), COALESCE(SUM(status = {bore}), 0), TOTAL(blink_rate), '
+             'TOTAL(yawn_rate), TOTAL(gaze_ratio), TOTAL(head_movement_rate)').format(bore=STATUSES.index('bore'))
+_ROLLUP_SUMS = ('emotion, TOTAL(n), TOTAL(scored), TOTAL(bore), TOTAL(blink_rate), TOTAL(yawn_rate), '
+                'TOTAL(gaze_ratio), TOTAL(head_movement_rate)')
+
+_COLUMNS = ('user_id', 'ts', 'face_image', 'emotion', 'blink_rate', 'yawn_rate', 'gaze_ratio', 'head_pose',
+            'head_movement_rate')
+
+
+def parse_time(value):
+    """Epoch seconds or an ISO date/time (local time) -> epoch seconds; None passes through."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def tail_csv(path, offset=0):
+    """
+    Rows (dicts) appended to a CSV after byte `offset`, and the offset to pass
+    next time. Only complete lines are returned, so a row that is still being
+    written is picked up by the next call. If the file shrank it was replaced
+    and is read from the start.
+    """
+    with open(path, 'rb') as f:
+        header_line = f.readline()
+        if offset > f.seek(0, 2):
+            offset = 0
+        offset = max(offset, len(header_line))
+        f.seek(offset)
+        data = f.read()
+    data = data[:data.rfind(b'\n') + 1]
+    header = next(csv.reader([header_line.decode()]))
+    return list(csv.DictReader(data.decode().splitlines(), fieldnames=header)), offset + len(data)
+
+
+class SessionStore:
+    """Window history in SQLite with indexed range queries."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add_windows(self, rows, user_id=''):
+        """
+        Insert window rows (dicts keyed by WINDOW_COLUMNS, e.g. from tail_csv()).
+        A row without a user_id gets `user_id`. Re-adding a window replaces it.
+        """
+        if not rows:
+            return 0
+        emotions = emotion_codes([r['emotion'] for r in rows])
+        poses = head_pose_codes([r['head_pose'] for r in rows])
+        records = [(r.get('user_id') or user_id, int(float(r['timestamp'])), r['face_image'] or None, int(e),
+                    float(r['blink_rate']), float(r['yawn_rate']), float(r['gaze_ratio']), int(p),
+                    float(r['head_movement_rate']))
+                   for r, e, p in zip(rows, emotions, poses)]
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO windows ({}) VALUES ({})'.format(
+                ', '.join(_COLUMNS), ', '.join('?' * len(_COLUMNS))), records)
+            self._refresh_hours({(r[0], r[1] - r[1] % HOUR) for r in records})
+        return len(records)
+
+    def _refresh_hours(self, user_hours):
+        """Recompute the rollup rows of the given (user_id, hour) pairs from the raw windows."""
+        for user_id, hour in user_hours:
+            self.db.execute('DELETE FROM hourly WHERE user_id = ? AND hour = ?', (user_id, hour))
+            self.db.execute(
+                'INSERT INTO hourly SELECT ?, ?, ' + _RAW_SUMS +
+                ' FROM windows WHERE user_id = ? AND ts >= ? AND ts < ? GROUP BY emotion',
+                (user_id, hour, user_id, hour, hour + HOUR))
+
+    def ingest_csv(self, csv_path=CSV_PATH, user_id=''):
+        """Add the rows appended to a capture CSV since the last ingest; returns the number added."""
+        key = str(Path(csv_path).resolve())
+        row = self.db.execute('SELECT offset FROM sources WHERE path = ?', (key,)).fetchone()
+        rows, offset = tail_csv(csv_path, row[0] if row else 0)
+        added = self.add_windows(rows, user_id)
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO sources (path, offset) VALUES (?, ?)', (key, offset))
+        return added
+
+    def score(self, model_path=MODEL_PATH, batch=5000):
+        """Fill in status for unscored windows with the model bundle, in batches; returns the number scored."""
+        import joblib
+        import pandas as pd
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            bundle = joblib.load(model_path)
+        model, scaler = bundle['model'], bundle['scaler']
+        done = 0
+        while True:
+            rows = self.db.execute(
+                'SELECT user_id, ts, emotion, blink_rate, yawn_rate, gaze_ratio, head_pose, head_movement_rate '
+                'FROM windows WHERE status IS NULL LIMIT ?', (batch,)).fetchall()
+            if not rows:
+                return done
+            cols = list(zip(*rows))
+            # categorical columns are already schema codes
+            X = model_matrix(cols[3], cols[4], np.asarray(cols[5], dtype=np.float64) * 100.0, cols[7],
+                             np.asarray(cols[2], dtype=np.intp), np.asarray(cols[6], dtype=np.intp))
+            pred = model.predict(scaler.transform(pd.DataFrame(X, columns=feature_order)))
+            with self.db:
+                self.db.executemany('UPDATE windows SET status = ? WHERE user_id = ? AND ts = ?',
+                                    [(int(p), u, t) for p, u, t in zip(pred, cols[0], cols[1])])
+                self._refresh_hours({(u, t - t % HOUR) for u, t in zip(cols[0], cols[1])})
+            done += len(rows)
+
+    def _sums(self, table, sums, ts_col, user_id, start, end):
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append('user_id = ?')
+            params.append(user_id)
+        if start is not None:
+            clauses.append(ts_col + ' >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append(ts_col + ' < ?')
+            params.append(end)
+        where = (' WHERE ' + ' AND '.join(clauses)) if clauses else ''
+        return self.db.execute('SELECT ' + sums + ' FROM ' + table + where + ' GROUP BY emotion', params).fetchall()
+
+    def summary(self, user_id=None, start=None, end=None):
+        """
+        Aggregates over windows with start <= timestamp < end (epoch seconds, None =
+        open): window count, bore fraction of the scored windows, mean rates and
+        an emotion histogram.
+        """
+        # whole hours come from the rollup, the partial hours at either end from raw windows
+        first = None if start is None else -(-int(start) // HOUR) * HOUR
+        last = None if end is None else int(end) // HOUR * HOUR
+        if first is not None and last is not None and first >= last:
+            parts = self._sums('windows', _RAW_SUMS, 'ts', user_id, start, end)
+        else:
+            parts = self._sums('hourly', _ROLLUP_SUMS, 'hour', user_id, first, last)
+            if start is not None and start < first:
+                parts += self._sums('windows', _RAW_SUMS, 'ts', user_id, start, first)
+            if end is not None and last < end:
+                parts += self._sums('windows', _RAW_SUMS, 'ts', user_id, last, end)
+
+        totals = [0.0] * 7
+        emotions = {}
+        for row in parts:
+            label = EMOTIONS[row[0]]
+            emotions[label] = emotions.get(label, 0) + int(row[1])
+            totals = [t + v for t, v in zip(totals, row[1:])]
+        n, scored, bore, blink, yawn, gaze, head = totals
+        return {
+            'windows': int(n),
+            'scored': int(scored),
+            'bore_fraction': bore / scored if scored else None,
+            'mean_blink_rate': blink / n if n else None,
+            'mean_yawn_rate': yawn / n if n else None,
+            'mean_gaze_ratio': gaze / n if n else None,
+            'mean_head_movement_rate': head / n if n else None,
+            'emotions': emotions,
+        }
+
+    def users(self):
+        return [u for (u,) in self.db.execute('SELECT DISTINCT user_id FROM windows ORDER BY user_id')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Window history and time-range analytics')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    ingest = sub.add_parser('ingest', help='Add new rows of a capture CSV')
+    ingest.add_argument('--csv', type=str, default=str(CSV_PATH))
+    ingest.add_argument('--user', type=str, default='', help='User for rows without a user_id')
+    score = sub.add_parser('score', help='Label unscored windows with the model')
+    score.add_argument('--model', type=str, default=str(MODEL_PATH))
+    summary = sub.add_parser('summary', help='Aggregates over a time range')
+    summary.add_argument('--user', type=str, default=None)
+    summary.add_argument('--start', type=str, default=None, help='Epoch seconds or ISO time (inclusive)')
+    summary.add_argument('--end', type=str, default=None, help='Epoch seconds or ISO time (exclusive)')
+    parser.add_argument('--db', type=str, default=str(DB_PATH), help='Session database')
+    args = parser.parse_args()
+
+    store = SessionStore(args.db)
+    if args.cmd == 'ingest':
+        print('Added {} windows'.format(store.ingest_csv(args.csv, args.user)))
+    elif args.cmd == 'score':
+        print('Scored {} windows'.format(store.score(args.model)))
+    else:
+        t0 = time.perf_counter()
+        result = store.summary(args.user, parse_time(args.start), parse_time(args.end))
+        for key, value in result.items():
+            print('{:<24} {}'.format(key, value))
+        print('({:.1f} ms)'.format((time.perf_counter() - t0) * 1000))
+    store.close()
@@ -0,0 +1,175 @@
+# snapshots.py
+import os
+import queue
+import struct
+import threading
+from collections import deque
+from pathlib import Path
+import cv2
+import numpy as np
+
+SNAPSHOT_KEEP = ('all', 'flagged', 'none')
+ARCHIVE_PREFIX = 'faces_'
+ARCHIVE_SUFFIX = '.pack'
+# archive record: timestamp (int64), JPEG length (uint32), then the JPEG bytes
+RECORD_HEADER = struct.Struct('<qI')
+
+
+class SnapshotWriter:
+    """
+    Encodes and stores the per-window face crops on a background thread, so the
+    capture loop only pays for a copy of the crop.
+
+    Crops are downscaled to `max_side` pixels (0 keeps the size) and JPEG-encoded
+    at `quality`. They go either to one <timestamp>.jpg per window or, with
+    `archive`, to append-only faces_<first timestamp>.pack segments of about
+    `segment_mb` each. Once more than `max_count` snapshots or `max_mb` are stored
+    (0 = no limit) the oldest files / segments are deleted. Counting is per
+    file, so for archives `max_count` limits segments rather than crops.
+    """
+
+    def __init__(self, out_dir, quality=90, max_side=0, max_count=0, max_mb=0, archive=False, segment_mb=64,
+                 queue_size=8):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.quality = int(quality)
+        self.max_side = int(max_side)
+        self.max_count = int(max_count)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.archive = archive
+        self.segment_bytes = int(segment_mb * 1024 * 1024)
+        self.dropped = 0
+        # (path, size) of stored files, oldest first
+        pattern = ARCHIVE_PREFIX + '*' + ARCHIVE_SUFFIX if archive else '*.jpg'
+        existing = sorted(self.out_dir.glob(pattern), key=lambda p: p.stat().st_mtime)
+        self._files = deque((p, p.stat().st_size) for p in existing)
+        self._total = sum(size for _, size in self._files)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='snapshot-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, timestamp, crop):
+        """
+        Queue a crop for writing and return the reference stored in the CSV: the
+        .jpg path, or '<dir>#<timestamp>' when archiving. The crop is copied, so
+        the caller may reuse its buffer. Returns '' if the writer is backlogged.
+        """
+        try:
+            self._queue.put_nowait((timestamp, crop.copy()))
+        except queue.Full:
+            self.dropped += 1
+            return ''
+        if self.archive:
+            return '{}#{}'.format(self.out_dir, timestamp)
+        return str(self.out_dir / '{}.jpg'.format(timestamp))
+
+    def close(self):
+        """Write everything still queued, then stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+        if self.dropped:
+            print('Snapshot writer dropped {} crops (queue full)'.format(self.dropped))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            timestamp, crop = item
+            try:
+                self._write(timestamp, crop)
+            except Exception as e:
+                print('Snapshot write failed:', e)
+
+    def _encode(self, crop):
+        h, w = crop.shape[:2]
+        if self.max_side and max(h, w) > self.max_side:
+            scale = self.max_side / float(max(h, w))
+            crop = cv2.resize(crop, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode('.jpg', crop, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise RuntimeError('JPEG encoding failed')
+        return buf.tobytes()
+
+    def _write(self, timestamp, crop):
+        data = self._encode(crop)
+        if self.archive:
+            size = RECORD_HEADER.size + len(data)
+            if not self._files or self._files[-1][1] + size > self.segment_bytes:
+                self._files.append((self.out_dir / '{}{}{}'.format(ARCHIVE_PREFIX, timestamp, ARCHIVE_SUFFIX), 0))
+            target, seg_size = self._files[-1]
+            with open(target, 'ab') as f:
+                f.write(RECORD_HEADER.pack(timestamp, len(data)))
+                f.write(data)
+            self._files[-1] = (target, seg_size + size)
+        else:
+            target = self.out_dir / '{}.jpg'.format(timestamp)
+            tmp = target.with_suffix('.tmp')
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, target)
+            size = len(data)
+            self._files.append((target, size))
+        self._total += size
+        self._enforce_retention()
+
+    def _enforce_retention(self):
+        # the newest file (possibly the open archive segment) is never deleted
+        while len(self._files) > 1 and ((self.max_count and len(self._files) > self.max_count) or
+                                        (self.max_bytes and self._total > self.max_bytes)):
+            path, size = self._files.popleft()
+            self._total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def keep_snapshot(policy, emotion_label, gaze_ratio, gaze_below=0.5):
+    """
+    Whether a window's crop is stored under the retention policy. 'flagged'
+    keeps windows that look disengaged or uncertain at capture time: mostly
+    off-screen gaze, or an emotion the model could not determine. Bore labels
+    are only assigned later by the model, so they are not available here.
+    """
+    if policy == 'none':
+        return False
+    if policy == 'flagged':
+        return gaze_ratio < gaze_below or emotion_label == 'unknown'
+    return True
+
+
+def iter_archive(path):
+    """(timestamp, jpeg_bytes) for each record of a faces_*.pack segment."""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            timestamp, length = RECORD_HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, data
+
+
+def _segment_start(path):
+    return int(path.name[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)])
+
+
+def load_snapshot(ref):
+    """Decode a face_image reference from data.csv (a .jpg path or '<dir>#<timestamp>'); None if gone."""
+    if not ref:
+        return None
+    if '#' not in ref:
+        return cv2.imread(ref)
+    out_dir, ts = ref.rsplit('#', 1)
+    ts = int(ts)
+    # segments are named after their first timestamp; the crop is in the last one starting at or before it
+    segments = [p for p in Path(out_dir).glob(ARCHIVE_PREFIX + '*' + ARCHIVE_SUFFIX) if _segment_start(p) <= ts]
+    if not segments:
+        return None
+    for timestamp, data in iter_archive(max(segments, key=_segment_start)):
+        if timestamp == ts:
+            return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    return None
@@ -0,0 +1,92 @@
+# streaming.py
+import bisect
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate (Jain & Chlamtac P-square algorithm).
+    Keeps five markers regardless of how many samples are added.
+    """
+
+    def __init__(self, p=0.5):
+        self.p = p
+        self.count = 0
+        self._q = []
+        self._n = [0, 1, 2, 3, 4]
+        self._np = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self._dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x):
+        self.count += 1
+        q = self._q
+        if self.count <= 5:
+            bisect.insort(q, x)
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x) - 1
+
+        n = self._n
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._np[i] += self._dn[i]
+
+        for i in (1, 2, 3):
+            d = self._np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = self._parabolic(i, d)
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self._q, self._n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            return self._q[int(round(self.p * (self.count - 1)))]
+        return self._q[2]
+
+    def reset(self):
+        self.__init__(self.p)
+
+
+class ConvergenceMonitor:
+    """
+    Reports convergence once every estimate has changed by less than `tol`
+    (relative) for `patience` consecutive checks.
+    """
+
+    def __init__(self, tol=0.01, patience=6):
+        self.tol = tol
+        self.patience = patience
+        self.stable = 0
+        self._prev = None
+
+    def update(self, estimates):
+        estimates = tuple(estimates)
+        if any(e is None for e in estimates):
+            self.stable = 0
+            self._prev = None
+            return False
+        if self._prev is not None and all(
+                abs(e - p) <= self.tol * max(abs(p), 1e-9) for e, p in zip(estimates, self._prev)):
+            self.stable += 1
+        else:
+            self.stable = 0
+        self._prev = estimates
+        return self.stable >= self.patience
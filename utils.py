@@ -21,18 +21,47 @@ POSE_IDX = [1, 199, 33, 263, 61, 291]  # reorder slightly for more robust mappin
 def _to_pixel_coords(landmark, w, h):
     return (int(landmark.x * w), int(landmark.y * h))
 
+def landmarks_to_array(landmarks, out=None):
+    """
+    Copy MediaPipe landmarks into an (N, 2) array of normalized x, y.
+    Pass the previous result as `out` to reuse it instead of allocating.
+    """
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    n = len(landmarks)
+    if out is None or out.shape != (n, 2):
+        out = np.empty((n, 2), dtype=np.float64)
+    for i, p in enumerate(landmarks):
+        out[i, 0] = p.x
+        out[i, 1] = p.y
+    return out
+
+def face_bbox(landmarks, img_w, img_h, margin=10):
+    """Pixel box (xmin, ymin, xmax, ymax) around an (N, 2|3) normalized landmark array, or None if empty."""
+    xs = landmarks[:, 0]
+    ys = landmarks[:, 1]
+    xmin, xmax = max(int(xs.min() * img_w) - margin, 0), min(int(xs.max() * img_w) + margin, img_w)
+    ymin, ymax = max(int(ys.min() * img_h) - margin, 0), min(int(ys.max() * img_h) + margin, img_h)
+    if xmax > xmin and ymax > ymin:
+        return xmin, ymin, xmax, ymax
+    return None
+
 def euclidean(a, b):
     return math.hypot(a[0] - b[0], a[1] - b[1])
 
 def get_landmark_coords(landmarks, indices, img_w, img_h):
     """
-    landmarks: MediaPipe landmark list (each has x,y) OR dlib shape-like
+    landmarks: MediaPipe landmark list (each has x,y), (N, 2|3) normalized array OR dlib shape-like
     indices: list of indices
     returns list of (x,y) pixel coordinates
     """
     coords = []
     if landmarks is None:
         return coords
+    # (N, 2|3) array of normalized coordinates, e.g. from the FaceMesh worker process
+    if isinstance(landmarks, np.ndarray):
+        # per-element indexing beats fancy indexing for the handful of points used here
+        return [(int(landmarks[i, 0] * img_w), int(landmarks[i, 1] * img_h)) for i in indices]
     # Try MediaPipe style
     try:
         first = landmarks[0]
@@ -162,8 +191,3 @@ def head_pose(landmarks, img_w, img_h, camera_matrix=None, dist_coeffs=None):
         return (yaw, pitch, roll), label
     except Exception:
         return None, None
-
-def ema(prev, value, alpha=0.3):
-    if prev is None:
-        return value
-    return alpha * value + (1 - alpha) * prev
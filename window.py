@@ -0,0 +1,70 @@
+# window.py
+import numpy as np
+
+from schema import WINDOW_SEC
+
+
+class WindowAggregator:
+    """
+    Per-window counters collected by capture. rates() turns them into the
+    per-second values written to output/data.csv at the end of each window.
+    """
+
+    def __init__(self, window_sec=WINDOW_SEC):
+        self.window_sec = window_sec
+        self._face_buf = None
+        self.reset()
+
+    def reset(self):
+        self.blink_count = 0
+        self.yawn_count = 0
+        self.gaze_on_count = 0
+        self.face_present_count = 0
+        self.total_frames = 0
+        self.head_last_label = None
+        self.head_movement_count = 0
+        self.best_area = 0
+        self._best_face = None
+
+    def add_head_label(self, label):
+        if label is None:
+            return
+        if self.head_last_label is None:
+            self.head_last_label = label
+        elif label != self.head_last_label:
+            self.head_movement_count += 1
+            self.head_last_label = label
+
+    def add_face(self, area, crop):
+        """
+        Keep the largest crop of the window. It is copied into a buffer reused across
+        windows, so the source frame can be overwritten and no frames are retained.
+        """
+        if area <= self.best_area:
+            return
+        ch, cw = crop.shape[:2]
+        buf = self._face_buf
+        if buf is None or buf.shape[0] < ch or buf.shape[1] < cw or buf.shape[2:] != crop.shape[2:]:
+            # sized for the biggest crop seen so far; grows rarely
+            h = max(ch, buf.shape[0] if buf is not None else 0)
+            w = max(cw, buf.shape[1] if buf is not None else 0)
+            buf = self._face_buf = np.empty((h, w) + crop.shape[2:], dtype=crop.dtype)
+        self._best_face = buf[:ch, :cw]
+        np.copyto(self._best_face, crop)
+        self.best_area = area
+
+    def face_detected(self):
+        return self.face_present_count >= self.total_frames * 0.5 and self._best_face is not None
+
+    def best_face(self):
+        return self._best_face
+
+    def rates(self):
+        """(blink_rate, yawn_rate, gaze_ratio, head_pose, head_movement_rate) for the finished window."""
+        window_sec = self.window_sec
+        blink_rate = round(self.blink_count / window_sec, 3)  # Blinks per second
+        yawn_rate = round(self.yawn_count / window_sec, 3)  # Yawns per second
+        head_movement_rate = round(self.head_movement_count / window_sec, 3)  # Movements per second
+        gaze_ratio = round(self.gaze_on_count / max(1, self.total_frames), 3)  # Gaze ratio (0-1)
+        final_head_pose = self.head_last_label if self.head_last_label else 'unknown'
+        return blink_rate, yawn_rate, gaze_ratio, final_head_pose, head_movement_rate